@@ -0,0 +1,128 @@
+from db.models import get_connection, transaction
+from db.filters import filter_clause
+
+# Columns shown in the main dances table, in display order
+LIST_COLUMNS = [
+	("name", "Name"),
+	("choreographer", "Choreographer"),
+	("release_date", "Release Date"),
+	("level", "Level"),
+	("count", "Count"),
+	("wall", "Wall"),
+	("tag", "Tag"),
+	("restart", "Restart"),
+	("known_status", "Known"),
+	("category", "Category"),
+	("priority", "Priority"),
+	("action", "Action"),
+]
+
+# Every user-editable column, in the order the edit dialog uses
+DANCE_FIELDS = [
+	"name", "choreographer", "release_date", "level", "count", "wall", "tag", "restart",
+	"stepsheet_url", "known_status", "category", "priority", "action", "notes",
+]
+
+# Allowed values for the fields the edit dialog offers as drop-downs ('' means unset)
+FIELD_CHOICES = {
+	"known_status": ["Yes", "Kinda", "No", "On the Floor"],
+	"category": ["Learn Next", "Learn Soon", "Learn Later", "Uncategorized"],
+	"priority": ["High", "Medium", "Low"],
+	"action": ["Learn", "Practice"],
+}
+
+_LIST_SELECT = "SELECT id, " + ", ".join(name for name, _ in LIST_COLUMNS) + " FROM dances"
+
+def _where(condition, params, filters):
+	# Append the db.filters predicates (if any) to a WHERE condition
+	extra, extra_params = filter_clause(filters)
+	if extra:
+		return f" WHERE {condition} AND {extra}", list(params) + extra_params
+	return f" WHERE {condition}", list(params)
+
+def fetch_dance_page(after_id=0, limit=500, conn=None, filters=None):
+	"""
+	Return up to `limit` list rows with id > after_id, ordered by id.
+	Each row is (id, *LIST_COLUMNS). Keyset paging keeps every page an index range scan.
+	`filters` narrows the rows, see db.filters.filter_clause.
+	"""
+	if conn is None:
+		conn = get_connection()
+	where, params = _where("id > ?", (after_id,), filters)
+	c = conn.execute(_LIST_SELECT + where + " ORDER BY id LIMIT ?", params + [limit])
+	return c.fetchall()
+
+def fetch_dance_row(dance_id, conn=None, filters=None):
+	"""
+	Return the list row (id, *LIST_COLUMNS) for one dance, or None if it no longer exists
+	(or does not match `filters`).
+	"""
+	if conn is None:
+		conn = get_connection()
+	where, params = _where("id = ?", (dance_id,), filters)
+	return conn.execute(_LIST_SELECT + where, params).fetchone()
+
+def fetch_dance_rows(dance_ids, conn=None, filters=None):
+	"""
+	Return list rows for the given ids, in the order given. Missing ids (and rows not
+	matching `filters`) are skipped.
+	"""
+	dance_ids = list(dance_ids)
+	if not dance_ids:
+		return []
+	if conn is None:
+		conn = get_connection()
+	placeholders = ", ".join("?" for _ in dance_ids)
+	where, params = _where(f"id IN ({placeholders})", dance_ids, filters)
+	by_id = {row[0]: row for row in conn.execute(_LIST_SELECT + where, params)}
+	return [by_id[i] for i in dance_ids if i in by_id]
+
+def get_dance(dance_id, conn=None):
+	"""
+	Return every editable field of one dance as a dict, or None if it does not exist.
+	"""
+	if conn is None:
+		conn = get_connection()
+	row = conn.execute(
+		"SELECT " + ", ".join(DANCE_FIELDS) + " FROM dances WHERE id = ?", (dance_id,)
+	).fetchone()
+	return dict(zip(DANCE_FIELDS, row)) if row else None
+
+def insert_dance(fields):
+	"""
+	Insert a dance from a dict of DANCE_FIELDS and return its new id.
+	"""
+	names = [f for f in DANCE_FIELDS if f in fields]
+	with transaction() as conn:
+		c = conn.execute(
+			f"INSERT INTO dances ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+			[fields[f] for f in names]
+		)
+	return c.lastrowid
+
+def update_dance(dance_id, fields):
+	"""
+	Update the given DANCE_FIELDS of one dance. Returns dance_id.
+	"""
+	names = [f for f in DANCE_FIELDS if f in fields]
+	with transaction() as conn:
+		conn.execute(
+			f"UPDATE dances SET {', '.join(f + '=?' for f in names)} WHERE id=?",
+			[fields[f] for f in names] + [dance_id]
+		)
+	return dance_id
+
+def delete_dance(dance_id):
+	"""
+	Delete one dance. Returns dance_id.
+	"""
+	return delete_dances([dance_id])[0]
+
+def delete_dances(dance_ids):
+	"""
+	Delete several dances in one transaction. Returns the ids.
+	"""
+	dance_ids = list(dance_ids)
+	with transaction() as conn:
+		conn.executemany("DELETE FROM dances WHERE id=?", [(i,) for i in dance_ids])
+	return dance_ids
@@ -0,0 +1,167 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from db.models import get_connection, initialize_db
+from db.dances import DANCE_FIELDS
+
+try:
+	import pyarrow
+	import pyarrow.parquet
+except ImportError:
+	pyarrow = None
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+# One row per dance; its songs (with artists and tags) come back as a JSON array,
+# so the result streams straight off the cursor without grouping in Python
+_EXPORT_SELECT = f'''
+	SELECT d.id, {", ".join("d." + f for f in DANCE_FIELDS)}, (
+		SELECT json_group_array(json_object(
+			'title', s.title,
+			'artists', json((SELECT json_group_array(sa.artist_name) FROM song_artists sa WHERE sa.song_id = s.id)),
+			'tags', json((SELECT json_group_array(st.tag) FROM song_tags st WHERE st.song_id = s.id)),
+			'bpm', s.bpm,
+			'genre', s.genre,
+			'spotify_url', s.spotify_url
+		))
+		FROM dance_songs ds JOIN songs s ON s.id = ds.song_id
+		WHERE ds.dance_id = d.id
+	)
+	FROM dances d ORDER BY d.id
+'''
+SONG_FIELDS = ("title", "artists", "tags", "bpm", "genre", "spotify_url")
+
+
+def iter_library(conn=None, batch_size=1000):
+	"""
+	Yield every dance as a dict of id, DANCE_FIELDS and 'songs' (a list of dicts with
+	SONG_FIELDS). Rows are pulled `batch_size` at a time inside one read transaction,
+	so memory stays flat and the export is a consistent snapshot.
+	"""
+	if conn is None:
+		conn = get_connection()
+	columns = ["id"] + DANCE_FIELDS
+	began = not conn.in_transaction
+	if began:
+		conn.execute("BEGIN")
+	try:
+		cursor = conn.execute(_EXPORT_SELECT)
+		while True:
+			rows = cursor.fetchmany(batch_size)
+			if not rows:
+				break
+			for row in rows:
+				dance = dict(zip(columns, row))
+				dance["songs"] = json.loads(row[-1]) if row[-1] else []
+				yield dance
+	finally:
+		if began:
+			conn.rollback()
+
+def _song_text(song):
+	artists = ", ".join(a for a in song["artists"] if a)
+	return f"{song['title']} - {artists}" if artists else song["title"]
+
+def write_csv(dances, stream):
+	"""
+	Flat CSV: songs become "Title - Artist; ..." and song tags a "; " separated list.
+	"""
+	writer = csv.writer(stream)
+	writer.writerow(["id"] + DANCE_FIELDS + ["songs", "song_tags"])
+	count = 0
+	for dance in dances:
+		tags = dict.fromkeys(t for song in dance["songs"] for t in song["tags"] if t)
+		writer.writerow(
+			[dance["id"]] + [dance[f] for f in DANCE_FIELDS]
+			+ ["; ".join(_song_text(s) for s in dance["songs"]), "; ".join(tags)]
+		)
+		count += 1
+	return count
+
+def write_jsonl(dances, stream):
+	count = 0
+	for dance in dances:
+		stream.write(json.dumps(dance, ensure_ascii=False) + "\n")
+		count += 1
+	return count
+
+def _parquet_schema():
+	song = pyarrow.struct([
+		("title", pyarrow.string()),
+		("artists", pyarrow.list_(pyarrow.string())),
+		("tags", pyarrow.list_(pyarrow.string())),
+		("bpm", pyarrow.int64()),
+		("genre", pyarrow.string()),
+		("spotify_url", pyarrow.string()),
+	])
+	return pyarrow.schema(
+		[("id", pyarrow.int64())] + [(f, pyarrow.string()) for f in DANCE_FIELDS]
+		+ [("songs", pyarrow.list_(song))]
+	)
+
+def write_parquet(dances, path, batch_size=1000):
+	"""
+	Parquet with songs as a nested list of structs; one row group per `batch_size` dances.
+	"""
+	if pyarrow is None:
+		raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+	schema = _parquet_schema()
+	count = 0
+	with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+		batch = []
+		for dance in dances:
+			batch.append(dance)
+			if len(batch) >= batch_size:
+				writer.write_table(pyarrow.Table.from_pylist(batch, schema))
+				count += len(batch)
+				batch = []
+		if batch:
+			writer.write_table(pyarrow.Table.from_pylist(batch, schema))
+			count += len(batch)
+	return count
+
+def export_library(path, fmt=None, batch_size=1000, conn=None):
+	"""
+	Export the whole library to `path` ('-' is stdout for csv/jsonl); the format
+	defaults to the file extension. The file is written under a temporary name and
+	renamed when complete, so readers never see a partial export. Returns the dance count.
+	"""
+	fmt = fmt or os.path.splitext(path)[1].lower().lstrip('.') or "jsonl"
+	if fmt not in EXPORT_FORMATS:
+		raise ValueError(f"Unknown export format {fmt!r}; choose one of {', '.join(EXPORT_FORMATS)}")
+	dances = iter_library(conn, batch_size)
+	if path == '-':
+		if fmt == "parquet":
+			raise ValueError("Parquet cannot be written to stdout")
+		return write_csv(dances, sys.stdout) if fmt == "csv" else write_jsonl(dances, sys.stdout)
+	tmp = f"{path}.{os.getpid()}.tmp"
+	try:
+		if fmt == "parquet":
+			count = write_parquet(dances, tmp, batch_size)
+		else:
+			with open(tmp, 'w', newline='' if fmt == "csv" else None, encoding='utf-8') as f:
+				count = write_csv(dances, f) if fmt == "csv" else write_jsonl(dances, f)
+		os.replace(tmp, path)
+	except BaseException:
+		if os.path.exists(tmp):
+			os.remove(tmp)
+		raise
+	return count
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Export every dance with its songs, artists and tags.")
+	ap.add_argument("path", help="output file, or '-' for stdout")
+	ap.add_argument("--format", choices=EXPORT_FORMATS, help="default: from the file extension")
+	ap.add_argument("--batch-size", type=int, default=1000, help="rows fetched (and Parquet row group size)")
+	args = ap.parse_args(argv)
+	initialize_db()
+	try:
+		count = export_library(args.path, args.format, args.batch_size)
+	except (ValueError, RuntimeError) as e:
+		ap.error(str(e))
+	print(f"Exported {count} dances.", file=sys.stderr)
+
+if __name__ == "__main__":
+	main()
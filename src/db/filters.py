@@ -0,0 +1,61 @@
+# Typed filter columns on dances (count_num, wall_num, level_code) and the SQL
+# predicates built on them. The columns are filled by triggers from the free-text
+# count/wall/level, so every writer (dialog, importers, scraper ingest) keeps them current.
+
+# Level codes, easiest first; a dance's code is its lowest level mentioned
+# ("Beginner / Improver" is a Beginner dance)
+LEVELS = [
+	(1, "Absolute Beginner"),
+	(2, "Beginner"),
+	(3, "Improver"),
+	(4, "Intermediate"),
+	(5, "Advanced"),
+]
+_LEVEL_WORDS = [("absolute", 1), ("beginner", 2), ("improver", 3), ("intermediate", 4), ("advanced", 5)]
+
+
+def number_sql(column):
+	"""
+	SQL for the leading integer of a text column ("32", "32 counts"), else NULL.
+	"""
+	return f"(CASE WHEN trim({column}) GLOB '[0-9]*' THEN CAST(trim({column}) AS INTEGER) END)"
+
+def level_sql(column):
+	"""
+	SQL mapping a free-text level to its LEVELS code, else NULL (LIKE ignores case).
+	"""
+	cases = ' '.join(f"WHEN {column} LIKE '%{word}%' THEN {code}" for word, code in _LEVEL_WORDS)
+	return f"(CASE {cases} END)"
+
+def typed_columns_sql(row):
+	# SET list refreshing the typed columns from `row` (new, or a table alias). Migration 7 built its
+	# triggers from a frozen copy (db.models._v7_*); changing the rules here needs a new migration.
+	return (
+		f"count_num = {number_sql(row + '.count')}, wall_num = {number_sql(row + '.wall')}, "
+		f"level_code = {level_sql(row + '.level')}"
+	)
+
+def filter_clause(filters, alias="dances"):
+	"""
+	Turn a filters dict into (SQL condition, params) over dances rows, or ('', []) when
+	nothing is filtered. Keys, all optional: 'levels' (LEVELS codes), 'count', 'wall',
+	'bpm_min', 'bpm_max' (a dance matches if any of its songs is in the BPM range).
+	"""
+	filters = filters or {}
+	conditions, params = [], []
+	levels = list(filters.get('levels') or ())
+	if levels:
+		conditions.append(f"{alias}.level_code IN ({', '.join('?' for _ in levels)})")
+		params.extend(levels)
+	for key, column in (('count', 'count_num'), ('wall', 'wall_num')):
+		if filters.get(key) is not None:
+			conditions.append(f"{alias}.{column} = ?")
+			params.append(filters[key])
+	bpm_min, bpm_max = filters.get('bpm_min'), filters.get('bpm_max')
+	if bpm_min is not None or bpm_max is not None:
+		conditions.append(
+			f"{alias}.id IN (SELECT ds.dance_id FROM songs s JOIN dance_songs ds ON ds.song_id = s.id "
+			"WHERE s.bpm BETWEEN ? AND ?)"
+		)
+		params.extend([bpm_min if bpm_min is not None else 0, bpm_max if bpm_max is not None else 10000])
+	return ' AND '.join(conditions), params
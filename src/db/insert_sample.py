@@ -1,24 +1,21 @@
-from db.models import get_connection, initialize_db
+from db.models import transaction, initialize_db
 
 def insert_sample_dance():
-	conn = get_connection()
-	c = conn.cursor()
-	c.execute('''
-		INSERT INTO dances (name, choreographer, level, stepsheet_url, known_status, category, priority, action, notes)
-		VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-	''', (
-		"Countdown",
-		"Turn Around (5,4,3,2,1) by Flo Rida",
-		"Improver",
-		"Step Sheet Link",
-		"No",
-		None,  # category (e.g., Learn Next, Learn Soon, etc.)
-		"High",
-		"Learn",
-		"32 count, 4 wall"
-	))
-	conn.commit()
-	conn.close()
+	with transaction() as conn:
+		conn.execute('''
+			INSERT INTO dances (name, choreographer, level, stepsheet_url, known_status, category, priority, action, notes)
+			VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+		''', (
+			"Countdown",
+			"Turn Around (5,4,3,2,1) by Flo Rida",
+			"Improver",
+			"Step Sheet Link",
+			"No",
+			None,  # category (e.g., Learn Next, Learn Soon, etc.)
+			"High",
+			"Learn",
+			"32 count, 4 wall"
+		))
 	print("Sample dance inserted.")
 
 if __name__ == "__main__":
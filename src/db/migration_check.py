@@ -0,0 +1,111 @@
+import os
+import sys
+import argparse
+import tempfile
+from db import models
+from db.models import MIGRATIONS, SCHEMA_VERSION, initialize_db, get_connection, close_connections, transaction
+
+# Dances as a library might hold them before migration 9: hand-entered rows sharing the
+# placeholder URL, the same stepsheet added twice, and rows with no URL at all
+FIXTURE_DANCES = (
+	("Sample Dance", "Jane Doe", "Step Sheet Link", "Beginner", "Fun", "High", "Practice", "from insert_sample"),
+	("Sample Dance Copy", "John Roe", "Step Sheet Link", "Novice", "Party", "Low", "Learn", "my notes"),
+	("Copperhead Road", "Rob Fowler", "https://www.copperknob.co.uk/stepsheets/1/copperhead-road", "Known", "", "", "", ""),
+	("Copperhead Road (class)", "", "https://www.copperknob.co.uk/stepsheets/1/copperhead-road", "", "Class", "Medium", "Teach", "Tuesday class"),
+	("No Link", "A. Nonymous", "", "", "", "", "", ""),
+	("Null Link", "B. Nonymous", None, "", "", "", "", ""),
+)
+
+
+def build_fixture(path, version, dances=FIXTURE_DANCES, unique_url_index=False):
+	"""
+	Create a database at `path` migrated only up to `version` (8 or later), holding `dances`
+	with a song link and a step sheet each. `unique_url_index` adds the unique stepsheet URL
+	index an early build of migration 9 created, as a database that ran it would have.
+	"""
+	close_connections()
+	models.DB_PATH = path
+	conn = get_connection()
+	for number, migrate in enumerate(MIGRATIONS[:version], start=1):
+		conn.execute("BEGIN")
+		with transaction(conn):
+			migrate(conn.cursor())
+			conn.execute(f"PRAGMA user_version = {number}")
+	conn.execute("BEGIN")
+	with transaction(conn):
+		for name, choreographer, url, known, category, priority, action, notes in dances:
+			dance_id = conn.execute(
+				"INSERT INTO dances (name, choreographer, level, count, wall, stepsheet_url, known_status, category, priority, action, notes) "
+				"VALUES (?, ?, 'Beginner', '32', '4', ?, ?, ?, ?, ?, ?)",
+				(name, choreographer, url, known, category, priority, action, notes)
+			).lastrowid
+			song_id = conn.execute("INSERT INTO songs (title) VALUES (?)", (f"{name} Song",)).lastrowid
+			conn.execute("INSERT INTO dance_songs (dance_id, song_id) VALUES (?, ?)", (dance_id, song_id))
+			conn.execute("INSERT INTO dance_steps (dance_id, data) VALUES (?, ?)", (dance_id, name.encode()))
+		if unique_url_index:
+			conn.execute("DROP INDEX IF EXISTS idx_dances_stepsheet_url")
+			conn.execute(
+				"CREATE UNIQUE INDEX idx_dances_stepsheet_url ON dances(stepsheet_url) "
+				"WHERE stepsheet_url IS NOT NULL AND stepsheet_url != ''"
+			)
+
+def snapshot(conn):
+	return {
+		'dances': conn.execute("SELECT * FROM dances ORDER BY id").fetchall(),
+		'dance_songs': conn.execute("SELECT dance_id, song_id FROM dance_songs ORDER BY id").fetchall(),
+		'dance_steps': conn.execute("SELECT dance_id, data FROM dance_steps ORDER BY dance_id").fetchall(),
+	}
+
+def check_upgrade(path, version, dances=FIXTURE_DANCES, unique_url_index=False):
+	"""
+	Upgrade a fixture (see build_fixture) to SCHEMA_VERSION. Returns a list of problems: rows
+	the upgrade changed or lost, or a stepsheet URL that can no longer be entered twice.
+	"""
+	problems = []
+	build_fixture(path, version, dances, unique_url_index)
+	conn = get_connection()
+	before = snapshot(conn)
+	initialize_db()
+	after = snapshot(conn)
+	for table, rows in before.items():
+		# Added columns may be appended to each row; the original ones must be untouched
+		width = len(rows[0]) if rows else 0
+		kept = [row[:width] for row in after[table]]
+		if kept != rows:
+			lost = [row for row in rows if row not in kept]
+			problems.append(f"{table}: {len(lost)} of {len(rows)} rows changed or lost by the upgrade, e.g. {lost[:1]}")
+	try:
+		conn.execute("BEGIN")
+		with transaction(conn):
+			for name in ("Repeat One", "Repeat Two"):
+				conn.execute("INSERT INTO dances (name, stepsheet_url) VALUES (?, 'Step Sheet Link')", (name,))
+	except Exception as e:
+		problems.append(f"two dances can no longer share a stepsheet URL: {e}")
+	if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+		problems.append("schema version not brought up to date")
+	close_connections()
+	return problems
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(
+		description="Upgrade fixture databases from older schema versions and check no dance data is lost."
+	)
+	ap.parse_args(argv)
+	# The unique index could only be built where no URL repeats
+	unique_urls = tuple({d[2]: d for d in reversed(FIXTURE_DANCES)}.values())
+	cases = (
+		("from version 8", 8, FIXTURE_DANCES, False),
+		("from version 9 with the unique URL index", 9, unique_urls, True),
+	)
+	failed = False
+	with tempfile.TemporaryDirectory() as tmp:
+		for number, (label, version, dances, unique_url_index) in enumerate(cases):
+			problems = check_upgrade(os.path.join(tmp, f"upgrade_{number}.sqlite3"), version, dances, unique_url_index)
+			print(f"{label}: {'ok' if not problems else 'FAILED'}")
+			for problem in problems:
+				print(f"  {problem}")
+			failed = failed or bool(problems)
+	return 1 if failed else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,13 +1,110 @@
+import re
 import sqlite3
+import threading
+import unicodedata
+import queue
+from contextlib import contextmanager
+from timing import timed, connection_factory, instrument_connection
 
 DB_PATH = "dance_db.sqlite3"
+# Connections kept around for worker threads (see pooled_connection)
+POOL_SIZE = 4
 
+# Applied once when a connection is opened, not per query
+PRAGMAS = (
+	"PRAGMA journal_mode=WAL",
+	"PRAGMA synchronous=NORMAL",
+	"PRAGMA cache_size=-20000",  # ~20 MB page cache
+	"PRAGMA mmap_size=268435456",  # 256 MB
+	"PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+def open_connection(check_same_thread=True):
+	"""
+	Open a new, tuned connection to DB_PATH.
+	Most code should use get_connection() or pooled_connection() instead.
+	"""
+	conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread, factory=connection_factory())
+	for pragma in PRAGMAS:
+		conn.execute(pragma)
+	return instrument_connection(conn)
+
+@timed("db.get_connection")
 def get_connection():
-	return sqlite3.connect(DB_PATH)
+	"""
+	Return the long-lived connection for the calling thread, opening it on first use.
+	Callers must not close it; close_connections() does that at shutdown.
+	"""
+	cached = getattr(_local, 'conn', None)
+	if cached is not None and cached[0] == DB_PATH:
+		return cached[1]
+	if cached is not None:
+		cached[1].close()
+	conn = open_connection()
+	_local.conn = (DB_PATH, conn)
+	return conn
 
-def initialize_db():
-	conn = get_connection()
-	c = conn.cursor()
+@contextmanager
+def pooled_connection():
+	"""
+	Borrow a connection from the worker pool for the duration of the block.
+	For QThreadPool/executor workers, which should not open a connection per task.
+	"""
+	conn = None
+	while conn is None:
+		try:
+			path, pooled = _pool.get_nowait()
+		except queue.Empty:
+			path, conn = DB_PATH, open_connection(check_same_thread=False)
+			break
+		if path == DB_PATH:
+			conn = pooled
+		else:
+			pooled.close()
+	try:
+		yield conn
+	finally:
+		if conn.in_transaction:
+			conn.rollback()
+		try:
+			_pool.put_nowait((path, conn))
+		except queue.Full:
+			conn.close()
+
+@contextmanager
+def transaction(conn=None):
+	"""
+	Run the block in one transaction: commit on success, roll back on error.
+	Uses the calling thread's connection unless one is given.
+	"""
+	if conn is None:
+		conn = get_connection()
+	try:
+		yield conn
+		conn.commit()
+	except Exception:
+		conn.rollback()
+		raise
+
+def close_connections():
+	"""
+	Close the calling thread's connection and every pooled connection.
+	"""
+	cached = getattr(_local, 'conn', None)
+	if cached is not None:
+		cached[1].close()
+		_local.conn = None
+	while True:
+		try:
+			_pool.get_nowait()[1].close()
+		except queue.Empty:
+			break
+
+def _create_tables(c):
 	# Dances table
 	c.execute('''
 		CREATE TABLE IF NOT EXISTS dances (
@@ -86,8 +183,261 @@ def initialize_db():
 			type TEXT
 		)
 	''')
-	conn.commit()
-	conn.close()
+
+def _add_dance_columns(c):
+	# Databases created by the old db/models.py lack these dance columns
+	existing = {row[1] for row in c.execute("PRAGMA table_info(dances)")}
+	for column in ("release_date", "count", "wall", "tag", "restart"):
+		if column not in existing:
+			c.execute(f"ALTER TABLE dances ADD COLUMN {column} TEXT")
+
+def _add_indexes(c):
+	# Join-table indexes include both ids so joins are answered from the index alone
+	c.execute("CREATE INDEX IF NOT EXISTS idx_dance_songs_dance ON dance_songs(dance_id, song_id)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_dance_songs_song ON dance_songs(song_id, dance_id)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_song_artists_song ON song_artists(song_id, artist_name)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_song_tags_song ON song_tags(song_id, tag)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_song_sources_song ON song_sources(song_id, source_id)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_dances_name_choreographer ON dances(name, choreographer)")
+
+# Song titles and artists of one dance as a single text blob, for the search index
+_DANCE_SONGS_TEXT = '''
+	(SELECT group_concat(s.title || ' ' || coalesce(
+		(SELECT group_concat(sa.artist_name, ' ') FROM song_artists sa WHERE sa.song_id = s.id), ''), ' ')
+	FROM dance_songs ds JOIN songs s ON s.id = ds.song_id
+	WHERE ds.dance_id = {dance_id})
+'''
+
+def _refresh_songs_sql(dance_id):
+	return f"UPDATE dance_fts SET songs = {_DANCE_SONGS_TEXT.format(dance_id=dance_id)} WHERE rowid = {dance_id};"
+
+def _refresh_song_dances_sql(song_id):
+	return (
+		f"UPDATE dance_fts SET songs = {_DANCE_SONGS_TEXT.format(dance_id='dance_fts.rowid')} "
+		f"WHERE rowid IN (SELECT dance_id FROM dance_songs WHERE song_id = {song_id});"
+	)
+
+def _add_search_index(c):
+	# Full-text index over dances, keyed by dances.id and kept current by triggers
+	c.execute('''
+		CREATE VIRTUAL TABLE IF NOT EXISTS dance_fts USING fts5(
+			name, choreographer, songs, notes,
+			tokenize = 'unicode61 remove_diacritics 2',
+			prefix = '2 3'
+		)
+	''')
+	triggers = {
+		"dances_fts_ai": "AFTER INSERT ON dances BEGIN "
+			"INSERT INTO dance_fts(rowid, name, choreographer, songs, notes) VALUES "
+			f"(new.id, new.name, new.choreographer, {_DANCE_SONGS_TEXT.format(dance_id='new.id')}, new.notes); END",
+		"dances_fts_au": "AFTER UPDATE OF name, choreographer, notes ON dances BEGIN "
+			"UPDATE dance_fts SET name = new.name, choreographer = new.choreographer, notes = new.notes "
+			"WHERE rowid = new.id; END",
+		"dances_fts_ad": "AFTER DELETE ON dances BEGIN DELETE FROM dance_fts WHERE rowid = old.id; END",
+		"dance_songs_fts_ai": f"AFTER INSERT ON dance_songs BEGIN {_refresh_songs_sql('new.dance_id')} END",
+		"dance_songs_fts_ad": f"AFTER DELETE ON dance_songs BEGIN {_refresh_songs_sql('old.dance_id')} END",
+		"dance_songs_fts_au": "AFTER UPDATE ON dance_songs BEGIN "
+			f"{_refresh_songs_sql('old.dance_id')} {_refresh_songs_sql('new.dance_id')} END",
+		"songs_fts_au": f"AFTER UPDATE OF title ON songs BEGIN {_refresh_song_dances_sql('new.id')} END",
+		"song_artists_fts_ai": f"AFTER INSERT ON song_artists BEGIN {_refresh_song_dances_sql('new.song_id')} END",
+		"song_artists_fts_ad": f"AFTER DELETE ON song_artists BEGIN {_refresh_song_dances_sql('old.song_id')} END",
+		"song_artists_fts_au": "AFTER UPDATE ON song_artists BEGIN "
+			f"{_refresh_song_dances_sql('old.song_id')} {_refresh_song_dances_sql('new.song_id')} END",
+	}
+	for name, body in triggers.items():
+		c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+	# Index whatever is already in the database
+	c.execute("DELETE FROM dance_fts")
+	c.execute(
+		"INSERT INTO dance_fts(rowid, name, choreographer, songs, notes) "
+		f"SELECT d.id, d.name, d.choreographer, {_DANCE_SONGS_TEXT.format(dance_id='d.id')}, d.notes FROM dances d"
+	)
+
+# Song-key rules as migration 5 shipped them. The migration must keep doing exactly this on
+# databases that have not run it yet, so it does not use db.normalize/db.songs, which may change.
+_V5_FEATURING = re.compile(r'[\(\[]?\s*\b(?:feat|ft|featuring)\b\.?.*$', re.IGNORECASE)
+_V5_BRACKETED = re.compile(r'[\(\[]([^\)\]]*)[\)\]]')
+_V5_VARIANT = re.compile(r'\b(?:remix|mix|version|live|acoustic|instrumental|cover)\b', re.IGNORECASE)
+_V5_NON_WORD = re.compile(r'[^\w]+')
+
+def _v5_fold(text):
+	text = unicodedata.normalize('NFKD', text or '')
+	return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower().replace('&', ' and ')
+
+def _v5_words(text):
+	return ' '.join(_V5_NON_WORD.sub(' ', text).replace('_', ' ').split())
+
+def _v5_artist_key(artist):
+	return _v5_words(_V5_FEATURING.sub('', _v5_fold(artist)))
+
+def _v5_song_key(title, artist):
+	text = _V5_FEATURING.sub('', _v5_fold(title))
+	text = _V5_BRACKETED.sub(lambda m: f' {m.group(1)} ' if _V5_VARIANT.search(m.group(1)) else ' ', text)
+	return f"{_v5_words(text)}|{_v5_artist_key(artist)}"
+
+def _v5_merge_duplicate_songs(c):
+	# Merge songs sharing a key into the lowest id, rewire references, key every artist
+	rows = c.execute('''
+		SELECT s.id, s.title,
+			(SELECT artist_name FROM song_artists sa WHERE sa.song_id = s.id ORDER BY sa.id LIMIT 1)
+		FROM songs s ORDER BY s.id
+	''').fetchall()
+	keep_for_key = {}
+	remap = {}
+	keys = {}
+	for song_id, title, artist in rows:
+		key = _v5_song_key(title, artist or '')
+		keep = keep_for_key.setdefault(key, song_id)
+		if keep != song_id:
+			remap[song_id] = keep
+		else:
+			keys[song_id] = key
+	pairs = [(keep, dup) for dup, keep in remap.items()]
+	for column in ("bpm", "genre", "spotify_url", "notes"):
+		c.executemany(
+			f"UPDATE songs SET {column} = (SELECT {column} FROM songs WHERE id = ?) "
+			f"WHERE id = ? AND {column} IS NULL",
+			[(dup, keep) for keep, dup in pairs]
+		)
+	for table in ("dance_songs", "song_artists", "song_tags", "song_sources"):
+		c.executemany(f"UPDATE OR IGNORE {table} SET song_id = ? WHERE song_id = ?", pairs)
+	c.executemany("DELETE FROM song_artists WHERE song_id = ?", [(dup,) for dup in remap])
+	c.executemany("DELETE FROM songs WHERE id = ?", [(dup,) for dup in remap])
+	c.executemany("UPDATE songs SET song_key = ? WHERE id = ?", [(k, i) for i, k in keys.items()])
+
+	seen = set()
+	repeated = []
+	artist_keys = []
+	for artist_id, artist_song, name in c.execute(
+		"SELECT id, song_id, artist_name FROM song_artists ORDER BY id"
+	).fetchall():
+		key = _v5_artist_key(name)
+		if (artist_song, key) in seen:
+			repeated.append((artist_id,))
+		else:
+			seen.add((artist_song, key))
+			artist_keys.append((key, artist_id))
+	c.executemany("DELETE FROM song_artists WHERE id = ?", repeated)
+	c.executemany("UPDATE song_artists SET artist_key = ? WHERE id = ?", artist_keys)
+	for table, columns in (("dance_songs", "dance_id, song_id"), ("song_tags", "song_id, tag"), ("song_sources", "song_id, source_id")):
+		c.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT min(id) FROM {table} GROUP BY {columns})")
+
+def _add_song_keys(c):
+	# Normalized keys so each song and each song's artist is stored once
+	c.execute("ALTER TABLE songs ADD COLUMN song_key TEXT")
+	c.execute("ALTER TABLE song_artists ADD COLUMN artist_key TEXT")
+	_v5_merge_duplicate_songs(c)
+	c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_songs_key ON songs(song_key)")
+	c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_song_artists_key ON song_artists(song_id, artist_key)")
+
+def _add_import_checkpoints(c):
+	# Rows of a bulk import already committed, so an interrupted import can resume (see importers.dance_list)
+	c.execute('''
+		CREATE TABLE IF NOT EXISTS import_checkpoints (
+			source TEXT PRIMARY KEY,
+			fingerprint TEXT NOT NULL,
+			rows_done INTEGER NOT NULL,
+			imported INTEGER NOT NULL,
+			rejected INTEGER NOT NULL
+		)
+	''')
+
+# Typed-column SQL as migration 7 shipped it; frozen like the _v5_ rules so later changes to
+# db.filters cannot alter what the migration builds.
+_V7_LEVEL_WORDS = (("absolute", 1), ("beginner", 2), ("improver", 3), ("intermediate", 4), ("advanced", 5))
+
+def _v7_number_sql(column):
+	return f"(CASE WHEN trim({column}) GLOB '[0-9]*' THEN CAST(trim({column}) AS INTEGER) END)"
+
+def _v7_level_sql(column):
+	cases = ' '.join(f"WHEN {column} LIKE '%{word}%' THEN {code}" for word, code in _V7_LEVEL_WORDS)
+	return f"(CASE {cases} END)"
+
+def _v7_typed_columns_sql(row):
+	return (
+		f"count_num = {_v7_number_sql(row + '.count')}, wall_num = {_v7_number_sql(row + '.wall')}, "
+		f"level_code = {_v7_level_sql(row + '.level')}"
+	)
+
+def _add_filter_columns(c):
+	# Typed copies of count/wall/level for filtering, kept current by triggers (see db.filters)
+	existing = {row[1] for row in c.execute("PRAGMA table_info(dances)")}
+	for column in ("count_num", "wall_num", "level_code"):
+		if column not in existing:
+			c.execute(f"ALTER TABLE dances ADD COLUMN {column} INTEGER")
+	c.execute(
+		"CREATE TRIGGER IF NOT EXISTS dances_typed_ai AFTER INSERT ON dances BEGIN "
+		f"UPDATE dances SET {_v7_typed_columns_sql('new')} WHERE id = new.id; END"
+	)
+	c.execute(
+		"CREATE TRIGGER IF NOT EXISTS dances_typed_au AFTER UPDATE OF count, wall, level ON dances BEGIN "
+		f"UPDATE dances SET {_v7_typed_columns_sql('new')} WHERE id = new.id; END"
+	)
+	c.execute(f"UPDATE dances SET {_v7_typed_columns_sql('dances')}")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_dances_level_count_wall ON dances(level_code, count_num, wall_num)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_dances_count_wall ON dances(count_num, wall_num)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_songs_bpm ON songs(bpm)")
+
+def _add_dance_steps(c):
+	# Compressed step sheets, one row per dance (see db.steps); kept out of dances so list queries never read them
+	c.execute('''
+		CREATE TABLE IF NOT EXISTS dance_steps (
+			dance_id INTEGER PRIMARY KEY,
+			data BLOB NOT NULL,
+			FOREIGN KEY(dance_id) REFERENCES dances(id)
+		)
+	''')
+	c.execute("CREATE TRIGGER IF NOT EXISTS dances_steps_ad AFTER DELETE ON dances BEGIN DELETE FROM dance_steps WHERE dance_id = old.id; END")
+
+def _add_stepsheet_url_index(c):
+	# Song links go with their dance, and stepsheet URLs are indexed so re-ingesting a crawl
+	# can find the dances it wrote before. Not unique: hand-entered URLs may repeat.
+	c.execute("CREATE TRIGGER IF NOT EXISTS dances_songs_ad AFTER DELETE ON dances BEGIN DELETE FROM dance_songs WHERE dance_id = old.id; END")
+	c.execute("DELETE FROM dance_songs WHERE dance_id NOT IN (SELECT id FROM dances)")
+	c.execute("CREATE INDEX IF NOT EXISTS idx_dances_stepsheet_url ON dances(stepsheet_url)")
+
+def _drop_stepsheet_url_unique(c):
+	# An early build of migration 9 made idx_dances_stepsheet_url unique; replace it with the plain index
+	unique = [row for row in c.execute("PRAGMA index_list(dances)") if row[1] == 'idx_dances_stepsheet_url' and row[2]]
+	if unique:
+		c.execute("DROP INDEX idx_dances_stepsheet_url")
+		c.execute("CREATE INDEX idx_dances_stepsheet_url ON dances(stepsheet_url)")
+
+# Schema migrations, applied in order. PRAGMA user_version records how many have run,
+# so append new steps to the end and never reorder or edit released ones.
+MIGRATIONS = [
+	_create_tables,
+	_add_dance_columns,
+	_add_indexes,
+	_add_search_index,
+	_add_song_keys,
+	_add_import_checkpoints,
+	_add_filter_columns,
+	_add_dance_steps,
+	_add_stepsheet_url_index,
+	_drop_stepsheet_url_unique,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def schema_version(conn=None):
+	if conn is None:
+		conn = get_connection()
+	return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def initialize_db():
+	"""
+	Bring the database schema up to SCHEMA_VERSION.
+	Each pending migration runs in its own transaction; an up-to-date database costs one PRAGMA read.
+	"""
+	conn = get_connection()
+	version = schema_version(conn)
+	if version >= SCHEMA_VERSION:
+		return
+	for number, migrate in enumerate(MIGRATIONS[version:], start=version + 1):
+		conn.execute("BEGIN")
+		with transaction(conn):
+			migrate(conn.cursor())
+			conn.execute(f"PRAGMA user_version = {number}")
 
 if __name__ == "__main__":
 	initialize_db()
@@ -0,0 +1,41 @@
+import re
+import unicodedata
+
+# "feat. X", "ft X", "featuring X" and everything after it
+_FEATURING = re.compile(r'[\(\[]?\s*\b(?:feat|ft|featuring)\b\.?.*$', re.IGNORECASE)
+# "(5,4,3,2,1)", "[Radio Edit]" ...
+_BRACKETED = re.compile(r'[\(\[]([^\)\]]*)[\)\]]')
+# Bracketed text that names a different recording is kept, e.g. "(Remix)" or "[Live]"
+_VARIANT = re.compile(r'\b(?:remix|mix|version|live|acoustic|instrumental|cover)\b', re.IGNORECASE)
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def _fold(text):
+	# Lowercase and drop accents: "Beyoncé" -> "beyonce"
+	text = unicodedata.normalize('NFKD', text or '')
+	return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower().replace('&', ' and ')
+
+def _words(text):
+	return ' '.join(_NON_WORD.sub(' ', text).replace('_', ' ').split())
+
+def normalize_title(title):
+	"""
+	Comparison form of a song title: case, accents, punctuation, featured artists and
+	bracketed asides are ignored, but "(Remix)"-style variants are kept.
+	"Turn Around (5,4,3,2,1)" and "turn around" both give "turn around".
+	"""
+	text = _FEATURING.sub('', _fold(title))
+	text = _BRACKETED.sub(lambda m: f' {m.group(1)} ' if _VARIANT.search(m.group(1)) else ' ', text)
+	return _words(text)
+
+def normalize_artist(artist):
+	"""
+	Comparison form of an artist name: "Flo Rida feat. Pitbull" gives "flo rida".
+	"""
+	return _words(_FEATURING.sub('', _fold(artist)))
+
+def song_key(title, artist=''):
+	"""
+	Unique key for a song: normalized title and primary artist.
+	"""
+	return f"{normalize_title(title)}|{normalize_artist(artist)}"
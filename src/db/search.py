@@ -0,0 +1,35 @@
+import re
+from db.models import get_connection
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(text):
+	"""
+	Turn free text typed by the user into an FTS5 MATCH expression.
+	Every word must match, and the last one is treated as a prefix so results update as you type.
+	Returns '' when there is nothing to search for.
+	"""
+	words = _WORD.findall(text)
+	if not words:
+		return ''
+	terms = [f'"{word}"' for word in words[:-1]]
+	terms.append(f'"{words[-1]}"*')
+	return ' '.join(terms)
+
+def search_dances(text, limit=200, conn=None):
+	"""
+	Full-text search over dance names, choreographers, songs/artists and notes.
+	Returns a list of (dance_id, snippet) pairs, best match first.
+	"""
+	query = build_match_query(text)
+	if not query:
+		return []
+	if conn is None:
+		conn = get_connection()
+	c = conn.execute(
+		"SELECT rowid, snippet(dance_fts, -1, '[', ']', '…', 10) FROM dance_fts "
+		"WHERE dance_fts MATCH ? ORDER BY rank LIMIT ?",
+		(query, limit)
+	)
+	return c.fetchall()
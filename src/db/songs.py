@@ -0,0 +1,113 @@
+from db.models import get_connection, transaction
+from db.normalize import song_key, normalize_artist
+
+# Tables that point at songs.id
+_SONG_REFERENCES = ("dance_songs", "song_artists", "song_tags", "song_sources")
+# Song columns copied from a duplicate when the surviving row has none
+_SONG_DETAILS = ("bpm", "genre", "spotify_url", "notes")
+
+
+def _insert_artists(conn, artists):
+	conn.executemany(
+		"INSERT INTO song_artists (song_id, artist_name, artist_key) VALUES (?, ?, ?) "
+		"ON CONFLICT(song_id, artist_key) DO NOTHING",
+		[(song_id, artist.strip(), normalize_artist(artist)) for song_id, artist in artists]
+	)
+
+def insert_songs(conn, songs, artists=(), columns=()):
+	"""
+	Add songs and their artists; every writer of songs (stepsheet ingest, synthetic libraries)
+	goes through here. Callers assign ids and resolve keys themselves, and run it inside
+	their own transaction.
+	`songs` are (id, title, song_key, *columns) rows with keys from db.normalize.song_key,
+	`artists` are (song_id, artist_name); an artist a song already has is skipped.
+	"""
+	names = ("id", "title", "song_key") + tuple(columns)
+	conn.executemany(
+		f"INSERT INTO songs ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})", songs
+	)
+	_insert_artists(conn, artists)
+
+def _delete_repeated_links(c, table, columns):
+	c.execute(f'''
+		DELETE FROM {table} WHERE id NOT IN (
+			SELECT min(id) FROM {table} GROUP BY {", ".join(columns)}
+		)
+	''')
+
+def merge_duplicate_songs(c):
+	"""
+	Recompute every song/artist key, merge songs that share a key into the lowest id
+	(rewiring dance_songs and the other song tables), and drop repeated links.
+	Runs on the given cursor without committing. Returns the number of songs merged away.
+	"""
+	rows = c.execute('''
+		SELECT s.id, s.title, s.song_key,
+			(SELECT artist_name FROM song_artists sa WHERE sa.song_id = s.id ORDER BY sa.id LIMIT 1)
+		FROM songs s ORDER BY s.id
+	''').fetchall()
+	keep_for_key = {}
+	remap = {}
+	new_keys = {}
+	for song_id, title, old_key, artist in rows:
+		key = song_key(title, artist or '')
+		keep = keep_for_key.setdefault(key, song_id)
+		if keep != song_id:
+			remap[song_id] = keep
+		elif key != old_key:
+			new_keys[song_id] = key
+
+	if remap:
+		pairs = [(keep, dup) for dup, keep in remap.items()]
+		# Fill in details the surviving song is missing from its duplicates
+		for column in _SONG_DETAILS:
+			c.executemany(
+				f"UPDATE songs SET {column} = (SELECT {column} FROM songs WHERE id = ?) "
+				f"WHERE id = ? AND {column} IS NULL",
+				[(dup, keep) for keep, dup in pairs]
+			)
+		for table in _SONG_REFERENCES:
+			# OR IGNORE leaves behind artists the surviving song already has; they go with the duplicate
+			c.executemany(f"UPDATE OR IGNORE {table} SET song_id = ? WHERE song_id = ?", pairs)
+		c.executemany("DELETE FROM song_artists WHERE song_id = ?", [(dup,) for dup in remap])
+		c.executemany("DELETE FROM songs WHERE id = ?", [(dup,) for dup in remap])
+
+	# Keys change in two steps so no intermediate state trips the unique index
+	c.executemany("UPDATE songs SET song_key = NULL WHERE id = ?", [(i,) for i in new_keys])
+	c.executemany("UPDATE songs SET song_key = ? WHERE id = ?", [(k, i) for i, k in new_keys.items()])
+
+	seen = set()
+	repeated = []
+	changed = []
+	for artist_id, artist_song, name, old_key in c.execute(
+		"SELECT id, song_id, artist_name, artist_key FROM song_artists ORDER BY id"
+	).fetchall():
+		key = normalize_artist(name)
+		if (artist_song, key) in seen:
+			repeated.append((artist_id,))
+		else:
+			seen.add((artist_song, key))
+			if key != old_key:
+				changed.append((key, artist_id))
+	c.executemany("DELETE FROM song_artists WHERE id = ?", repeated)
+	c.executemany("UPDATE song_artists SET artist_key = NULL WHERE id = ?", [(i,) for _, i in changed])
+	c.executemany("UPDATE song_artists SET artist_key = ? WHERE id = ?", changed)
+	_delete_repeated_links(c, "dance_songs", ("dance_id", "song_id"))
+	_delete_repeated_links(c, "song_tags", ("song_id", "tag"))
+	_delete_repeated_links(c, "song_sources", ("song_id", "source_id"))
+	return len(remap)
+
+def dedupe_songs():
+	"""
+	One-shot cleanup: merge duplicate songs/artists in a single transaction.
+	"""
+	conn = get_connection()
+	conn.execute("BEGIN IMMEDIATE")
+	with transaction(conn):
+		return merge_duplicate_songs(conn.cursor())
+
+if __name__ == "__main__":
+	from db.models import initialize_db
+	initialize_db()
+	merged = dedupe_songs()
+	print(f"Merged {merged} duplicate songs.")
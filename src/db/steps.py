@@ -0,0 +1,36 @@
+import json
+import zlib
+from db.models import get_connection, transaction
+
+# Step sheets are the bulk of a stepsheet page, so they live in their own table as
+# zlib-compressed JSON (about a fifth of the raw size) and are only read per dance.
+
+
+def encode_steps(steps):
+	return zlib.compress(json.dumps(steps, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 9)
+
+def decode_steps(data):
+	return json.loads(zlib.decompress(data).decode('utf-8'))
+
+def save_steps(dance_id, steps, conn=None):
+	"""
+	Store (or replace) a dance's steps, a list of {'section', 'step', 'desc'} dicts as
+	parse_copperknob_page returns them. An empty list removes them.
+	"""
+	with transaction(conn) as conn:
+		if steps:
+			conn.execute(
+				"INSERT OR REPLACE INTO dance_steps (dance_id, data) VALUES (?, ?)",
+				(dance_id, encode_steps(steps))
+			)
+		else:
+			conn.execute("DELETE FROM dance_steps WHERE dance_id = ?", (dance_id,))
+
+def load_steps(dance_id, conn=None):
+	"""
+	Return a dance's steps, or [] if none are stored.
+	"""
+	if conn is None:
+		conn = get_connection()
+	row = conn.execute("SELECT data FROM dance_steps WHERE dance_id = ?", (dance_id,)).fetchone()
+	return decode_steps(row[0]) if row else []
@@ -0,0 +1,116 @@
+import random
+import argparse
+from db.models import get_connection, initialize_db, transaction
+from db.normalize import song_key
+from db.songs import insert_songs
+
+# Word pools for believable names; the same seed always yields the same library
+_WORDS = (
+	"love heart night dance country road whiskey boots river moon summer rain fire honey "
+	"blue wild little sweet kiss shake slide cowboy girl boy home town dream midnight "
+	"rock roll shuffle stomp swing cha waltz rumba jive train highway sunset tequila"
+).split()
+_FIRST = "Rob Kate Maggie Jo Gary Niels Darren Simon Amy Ria Roy Guyton Scott Lee Jose Daniel Fred".split()
+_LAST = "Fowler Sala Gallagher Thompson Lafferty Poulsen Bailey Ward Glass Vos Verdonk Mundy Blevins Hom Miguel Trepat".split()
+_COUNTRIES = ["USA", "UK", "NL", "DK", "AUS", "ES", "BE", "SE", "CA", ""]
+_LEVELS = ["Absolute Beginner", "Beginner", "High Beginner", "Improver", "Improver", "Intermediate", "Advanced"]
+_COUNTS = ["32", "32", "32", "48", "64", "64", "96", "Phrased"]
+_WALLS = ["4", "4", "2", "2", "1"]
+_GENRES = ["country", "pop", "rock", "latin", "swing", "country pop", "irish", "r&b"]
+_TAGS = ["slow", "fast", "floor fave", "new", "classic", "social", "competition"]
+_CHOICES = {
+	"known_status": ["", "", "Yes", "Kinda", "No", "On the Floor"],
+	"category": ["", "Learn Next", "Learn Soon", "Learn Later", "Uncategorized"],
+	"priority": ["", "High", "Medium", "Low"],
+	"action": ["", "Learn", "Practice"],
+}
+
+
+def _title(rng, number):
+	# The number keeps every title (and so every song key) unique
+	return f"{' '.join(rng.choice(_WORDS).title() for _ in range(rng.randint(1, 3)))} {number}"
+
+def _person(rng):
+	return f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+
+def _next_id(conn, table):
+	# Past both the highest id and the AUTOINCREMENT high-water mark (as StepsheetIngester does),
+	# so ids of deleted rows are never handed out again
+	highest = conn.execute(f"SELECT coalesce(max(id), 0) FROM {table}").fetchone()[0]
+	row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+	return max(highest, row[0] if row else 0) + 1
+
+def generate_library(dances, songs=None, seed=0, batch_size=10000, conn=None, progress=None):
+	"""
+	Append `dances` synthetic dances (and `songs`, default dances // 2, shared between them)
+	with artists, tags and one to three songs per dance, written in batches with
+	executemany. The output depends only on the arguments, so sizes can be compared
+	run to run. Every row goes through the normal triggers, as the app's own writes do.
+	"""
+	if conn is None:
+		conn = get_connection()
+	songs = songs if songs is not None else max(1, dances // 2)
+	rng = random.Random(seed)
+
+	first_song = _next_id(conn, "songs")
+	for start in range(0, songs, batch_size):
+		song_rows, artist_rows, tag_rows = [], [], []
+		for song_id in range(first_song + start, first_song + min(start + batch_size, songs)):
+			title = _title(rng, song_id)
+			artists = [_person(rng) for _ in range(1 if rng.random() < 0.85 else 2)]
+			song_rows.append((
+				song_id, title, song_key(title, artists[0]), rng.randint(70, 190),
+				rng.choice(_GENRES), f"https://open.spotify.com/track/synthetic{song_id}",
+			))
+			artist_rows.extend((song_id, a) for a in artists)
+			tag_rows.extend((song_id, t) for t in rng.sample(_TAGS, rng.randint(0, 2)))
+		conn.execute("BEGIN IMMEDIATE")
+		with transaction(conn):
+			insert_songs(conn, song_rows, artist_rows, ("bpm", "genre", "spotify_url"))
+			conn.executemany("INSERT INTO song_tags (song_id, tag) VALUES (?, ?)", tag_rows)
+		if progress:
+			progress("songs", start + len(song_rows), songs)
+
+	first_dance = _next_id(conn, "dances")
+	for start in range(0, dances, batch_size):
+		dance_rows, link_rows = [], []
+		for dance_id in range(first_dance + start, first_dance + min(start + batch_size, dances)):
+			choreographers = [_person(rng) for _ in range(1 if rng.random() < 0.7 else 2)]
+			dance_rows.append((
+				dance_id, _title(rng, dance_id),
+				", ".join(f"{c} ({rng.choice(_COUNTRIES)})" for c in choreographers),
+				f"{rng.randint(1995, 2025)}-{rng.randint(1, 12):02d}",
+				rng.choice(_LEVELS), rng.choice(_COUNTS), rng.choice(_WALLS),
+				str(rng.randint(0, 2)) if rng.random() < 0.3 else "",
+				str(rng.randint(0, 2)) if rng.random() < 0.3 else "",
+				f"https://www.copperknob.co.uk/stepsheets/{dance_id}/synthetic",
+				*(rng.choice(_CHOICES[f]) for f in ("known_status", "category", "priority", "action")),
+				"",
+			))
+			linked = {first_song + rng.randrange(songs) for _ in range(rng.randint(1, 3))}
+			link_rows.extend((dance_id, song_id) for song_id in linked)
+		conn.execute("BEGIN IMMEDIATE")
+		with transaction(conn):
+			# Links first so the search-index trigger sees each dance's songs when it is inserted
+			conn.executemany("INSERT INTO dance_songs (dance_id, song_id) VALUES (?, ?)", link_rows)
+			conn.executemany(
+				"INSERT INTO dances (id, name, choreographer, release_date, level, count, wall, tag, restart, "
+				"stepsheet_url, known_status, category, priority, action, notes) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+				dance_rows
+			)
+		if progress:
+			progress("dances", start + len(dance_rows), dances)
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Fill the database with a synthetic dance library.")
+	ap.add_argument("dances", type=int)
+	ap.add_argument("--songs", type=int, help="default: half the number of dances")
+	ap.add_argument("--seed", type=int, default=0)
+	args = ap.parse_args(argv)
+	initialize_db()
+	generate_library(args.dances, args.songs, args.seed, progress=lambda what, done, total: print(f"\r{what}: {done}/{total}", end=''))
+	print()
+
+if __name__ == "__main__":
+	main()
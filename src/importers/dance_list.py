@@ -0,0 +1,324 @@
+import os
+import re
+import sys
+import csv
+import json
+import time
+import datetime
+import argparse
+from itertools import islice
+from db.models import get_connection, initialize_db, transaction
+from db.dances import DANCE_FIELDS, FIELD_CHOICES
+
+try:
+	import openpyxl
+except ImportError:
+	openpyxl = None
+
+# Spreadsheet headings understood besides the DANCE_FIELDS names themselves,
+# compared after lowercasing and collapsing punctuation to spaces
+COLUMN_ALIASES = {
+	"dance": "name",
+	"dance name": "name",
+	"dance title": "name",
+	"choreo": "choreographer",
+	"choreographers": "choreographer",
+	"choreographer s": "choreographer",
+	"choreographed by": "choreographer",
+	"release": "release_date",
+	"released": "release_date",
+	"date": "release_date",
+	"difficulty": "level",
+	"counts": "count",
+	"walls": "wall",
+	"tags": "tag",
+	"restarts": "restart",
+	"stepsheet": "stepsheet_url",
+	"step sheet": "stepsheet_url",
+	"url": "stepsheet_url",
+	"link": "stepsheet_url",
+	"known": "known_status",
+	"note": "notes",
+	"comments": "notes",
+}
+FORMATS = ("csv", "tsv", "jsonl", "xlsx")
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def _heading(text):
+	return ' '.join(_NON_ALNUM.sub(' ', str(text).lower()).split())
+
+def detect_format(path):
+	ext = os.path.splitext(path)[1].lower().lstrip('.')
+	if ext in ("jsonl", "ndjson", "json"):
+		return "jsonl"
+	if ext in ("xlsx", "xlsm"):
+		return "xlsx"
+	if ext == "tsv":
+		return "tsv"
+	return "csv"
+
+class InvalidRow:
+	"""
+	Stands in for a source row a reader could not decode, so it is counted and rejected
+	at its own position (and resume offsets stay right).
+	"""
+	def __init__(self, message):
+		self.message = message
+
+def read_csv(path, delimiter=None):
+	"""
+	Yield one {heading: value} dict per data row. The delimiter is sniffed unless given.
+	"""
+	with open(path, newline='', encoding='utf-8-sig') as f:
+		if delimiter is None:
+			try:
+				delimiter = csv.Sniffer().sniff(f.read(8192), delimiters=",;\t|").delimiter
+			except csv.Error:
+				delimiter = ','
+			f.seek(0)
+		yield from csv.DictReader(f, delimiter=delimiter)
+
+def read_jsonl(path):
+	"""
+	Yield one object per line of a JSON Lines file; a line that is not valid JSON
+	yields an InvalidRow.
+	"""
+	with open(path, encoding='utf-8-sig') as f:
+		for number, line in enumerate(f, start=1):
+			line = line.strip()
+			if not line:
+				continue
+			if number == 1 and line.startswith('['):
+				raise ValueError(f"{path} holds a JSON array; convert it to JSON Lines (one object per line)")
+			try:
+				yield json.loads(line)
+			except json.JSONDecodeError as e:
+				yield InvalidRow(f"line {number}: invalid JSON ({e.msg})")
+
+def read_xlsx(path, sheet=None):
+	"""
+	Yield one {heading: value} dict per row of a worksheet (the first, unless named);
+	the first row holds the headings. Rows are streamed with openpyxl's read-only mode.
+	"""
+	if openpyxl is None:
+		raise RuntimeError("Reading .xlsx files needs openpyxl (pip install openpyxl)")
+	workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+	try:
+		worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+		rows = worksheet.iter_rows(values_only=True)
+		headings = [str(h) if h is not None else '' for h in next(rows, ())]
+		for values in rows:
+			if any(v is not None and v != '' for v in values):
+				yield dict(zip(headings, values))
+	finally:
+		workbook.close()
+
+def read_rows(path, fmt=None, delimiter=None, sheet=None):
+	fmt = fmt or detect_format(path)
+	if fmt == "jsonl":
+		return read_jsonl(path)
+	if fmt == "xlsx":
+		return read_xlsx(path, sheet)
+	return read_csv(path, '\t' if fmt == "tsv" and delimiter is None else delimiter)
+
+def map_columns(headings, overrides=None):
+	"""
+	Return {heading: dance field} for the headings that correspond to a DANCE_FIELDS column.
+	`overrides` ({heading: field}) wins over the built-in names and aliases.
+	"""
+	known = {_heading(field): field for field in DANCE_FIELDS}
+	known.update(COLUMN_ALIASES)
+	overrides = {_heading(h): f for h, f in (overrides or {}).items()}
+	mapping = {}
+	for heading in headings:
+		key = _heading(heading)
+		field = overrides.get(key) or known.get(key)
+		if field and field not in mapping.values():
+			mapping[heading] = field
+	return mapping
+
+def _text(value):
+	if value is None:
+		return ''
+	if isinstance(value, datetime.datetime):
+		value = value.date()
+	if isinstance(value, datetime.date):
+		return value.isoformat()
+	if isinstance(value, float) and value.is_integer():
+		value = int(value)
+	return str(value).strip()
+
+_CHOICES = {field: {c.lower(): c for c in choices} for field, choices in FIELD_CHOICES.items()}
+
+def clean_row(raw, mapping):
+	"""
+	Turn one source row into a full DANCE_FIELDS dict. Raises ValueError if the row
+	has no name or a drop-down field holds a value the app does not offer.
+	"""
+	if isinstance(raw, InvalidRow):
+		raise ValueError(raw.message)
+	if not isinstance(raw, dict):
+		raise ValueError(f"expected an object, got {type(raw).__name__}")
+	fields = dict.fromkeys(DANCE_FIELDS, '')
+	for heading, field in mapping.items():
+		fields[field] = _text(raw.get(heading))
+	if not fields['name']:
+		raise ValueError("missing dance name")
+	for field, choices in _CHOICES.items():
+		value = fields[field]
+		if value:
+			if value.lower() not in choices:
+				raise ValueError(f"{field} {value!r} is not one of {', '.join(FIELD_CHOICES[field])}")
+			fields[field] = choices[value.lower()]
+	return fields
+
+def _fingerprint(path):
+	stat = os.stat(path)
+	return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+def load_checkpoint(path, conn=None):
+	"""
+	Return (rows_done, imported, rejected) recorded for an unfinished import of `path`,
+	or None when there is none or the file has changed since.
+	"""
+	if conn is None:
+		conn = get_connection()
+	row = conn.execute(
+		"SELECT fingerprint, rows_done, imported, rejected FROM import_checkpoints WHERE source = ?",
+		(os.path.abspath(path),)
+	).fetchone()
+	if row is None or row[0] != _fingerprint(path):
+		return None
+	return row[1:]
+
+def _chain_first(leading, first, rows):
+	yield from leading
+	if first is not None:
+		yield first
+	yield from rows
+
+def import_dance_list(path, fmt=None, batch_size=1000, mapping=None, resume=True, progress=None,
+		delimiter=None, sheet=None, conn=None):
+	"""
+	Stream a dance list (CSV/TSV, JSON Lines or XLSX) into the dances table.
+	Rows are committed `batch_size` at a time together with a checkpoint, so a rerun
+	with `resume` continues after the last committed batch. `progress(stats)` is
+	called after every batch. Returns the stats dict: rows, imported, rejected,
+	skipped (rows resumed past) and errors (the first 100 (row number, message) pairs).
+	"""
+	if conn is None:
+		conn = get_connection()
+	source = os.path.abspath(path)
+	fingerprint = _fingerprint(path)
+	stats = {'rows': 0, 'imported': 0, 'rejected': 0, 'skipped': 0, 'errors': []}
+	checkpoint = load_checkpoint(path, conn) if resume else None
+	if checkpoint:
+		stats['skipped'], stats['imported'], stats['rejected'] = checkpoint
+		stats['rows'] = stats['skipped']
+
+	rows = read_rows(path, fmt, delimiter, sheet)
+	# Headings come from the first decodable row; undecodable ones before it are still imported (as rejects)
+	leading = []
+	first = next(rows, None)
+	while isinstance(first, InvalidRow):
+		leading.append(first)
+		first = next(rows, None)
+	if first is None and not leading:
+		return stats
+	columns = map_columns(first.keys() if isinstance(first, dict) else (), mapping)
+	if first is not None and 'name' not in columns.values():
+		headings = first.keys() if isinstance(first, dict) else ()
+		raise ValueError(f"No dance name column in {path}; headings are {', '.join(map(str, headings))}")
+	rows = islice(_chain_first(leading, first, rows), stats['skipped'], None)
+
+	insert = f"INSERT INTO dances ({', '.join(DANCE_FIELDS)}) VALUES ({', '.join('?' for _ in DANCE_FIELDS)})"
+	batch = []
+	while True:
+		chunk = list(islice(rows, batch_size))
+		for raw in chunk:
+			stats['rows'] += 1
+			try:
+				fields = clean_row(raw, columns)
+			except ValueError as e:
+				stats['rejected'] += 1
+				if len(stats['errors']) < 100:
+					stats['errors'].append((stats['rows'], str(e)))
+				continue
+			batch.append([fields[f] for f in DANCE_FIELDS])
+		if not chunk:
+			break
+		conn.execute("BEGIN IMMEDIATE")
+		with transaction(conn):
+			conn.executemany(insert, batch)
+			conn.execute(
+				"INSERT OR REPLACE INTO import_checkpoints (source, fingerprint, rows_done, imported, rejected) "
+				"VALUES (?, ?, ?, ?, ?)",
+				(source, fingerprint, stats['rows'], stats['imported'] + len(batch), stats['rejected'])
+			)
+		stats['imported'] += len(batch)
+		batch = []
+		if progress:
+			progress(stats)
+	with transaction(conn):
+		conn.execute("DELETE FROM import_checkpoints WHERE source = ?", (source,))
+	return stats
+
+def _parse_mapping(pairs):
+	mapping = {}
+	for pair in pairs or ():
+		heading, sep, field = pair.rpartition('=')
+		if not sep or field not in DANCE_FIELDS:
+			raise argparse.ArgumentTypeError(f"--map expects HEADING=FIELD with FIELD one of {', '.join(DANCE_FIELDS)}")
+		mapping[heading] = field
+	return mapping
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Import a dance list (CSV, TSV, JSON Lines or XLSX) into the database.")
+	ap.add_argument("path")
+	ap.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+	ap.add_argument("--batch-size", type=int, default=1000, help="rows per transaction/checkpoint")
+	ap.add_argument("--map", action="append", metavar="HEADING=FIELD", help="map a column heading to a dance field")
+	ap.add_argument("--delimiter", help="CSV delimiter (default: sniffed)")
+	ap.add_argument("--sheet", help="XLSX worksheet name (default: the first)")
+	ap.add_argument("--restart", action="store_true", help="ignore any checkpoint and import from the first row")
+	args = ap.parse_args(argv)
+	try:
+		mapping = _parse_mapping(args.map)
+	except argparse.ArgumentTypeError as e:
+		ap.error(str(e))
+	initialize_db()
+
+	started = time.monotonic()
+	def report(stats):
+		elapsed = max(time.monotonic() - started, 1e-6)
+		print(
+			f"\r{stats['rows']} rows read, {stats['imported']} imported, {stats['rejected']} rejected "
+			f"({(stats['rows'] - stats['skipped']) / elapsed:.0f} rows/s)",
+			end='', file=sys.stderr, flush=True
+		)
+
+	if not args.restart:
+		checkpoint = load_checkpoint(args.path)
+		if checkpoint:
+			print(f"Resuming after row {checkpoint[0]}.", file=sys.stderr)
+	try:
+		stats = import_dance_list(
+			args.path, args.format, args.batch_size, mapping, resume=not args.restart,
+			progress=report, delimiter=args.delimiter, sheet=args.sheet
+		)
+	except KeyboardInterrupt:
+		print("\nInterrupted; rerun the same command to resume.", file=sys.stderr)
+		sys.exit(130)
+	except (ValueError, RuntimeError) as e:
+		ap.error(str(e))
+	print(file=sys.stderr)
+	for number, message in stats['errors']:
+		print(f"Row {number}: {message}", file=sys.stderr)
+	if stats['rejected'] > len(stats['errors']):
+		print(f"... and {stats['rejected'] - len(stats['errors'])} more rejected rows", file=sys.stderr)
+	print(f"Imported {stats['imported']} dances, rejected {stats['rejected']}.")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,197 @@
+import sys
+import json
+import argparse
+from db.models import get_connection, initialize_db, transaction
+from db.normalize import song_key
+from db.songs import insert_songs
+from db.steps import encode_steps
+
+def dance_row(parsed, url=None):
+	"""
+	Map a parse_copperknob_page dict onto dances columns.
+	"""
+	names = [c['name'].strip() for c in parsed.get('choreographers', []) if isinstance(c, dict) and c.get('name', '').strip()]
+	return {
+		'name': parsed.get('dance_name', ''),
+		'choreographer': ', '.join(names),
+		'release_date': parsed.get('release_date', ''),
+		'level': parsed.get('level', ''),
+		'count': parsed.get('count', ''),
+		'wall': parsed.get('wall', ''),
+		'stepsheet_url': url or parsed.get('stepsheet_url', ''),
+	}
+
+
+class StepsheetIngester:
+	"""
+	Buffers parsed stepsheets and writes them to dances, dance_steps, songs, song_artists and
+	dance_songs in one transaction per batch. Every distinct song (by db.normalize.song_key) is inserted
+	once: known songs are resolved through an in-memory key cache loaded on first flush.
+	A stepsheet whose URL is already in dances updates that dance and replaces its song links
+	and steps, so re-ingesting a crawl does not duplicate anything.
+	Row ids are assigned up front so each table is written with a single executemany.
+	"""
+	DANCE_COLUMNS = ['name', 'choreographer', 'release_date', 'level', 'count', 'wall', 'stepsheet_url']
+
+	def __init__(self, conn=None, batch_size=2000):
+		self.conn = conn or get_connection()
+		self.batch_size = batch_size
+		self.pending = []
+		self.song_ids = None  # {song_key: song id}
+		self.dances_written = 0
+		self.dances_updated = 0
+		self.songs_written = 0
+
+	def _load_songs(self):
+		self.song_ids = dict(self.conn.execute("SELECT song_key, id FROM songs WHERE song_key IS NOT NULL"))
+
+	def _claimed_keys(self, keys):
+		# Keys another writer inserted since the cache was loaded
+		found = {}
+		keys = list(keys)
+		for i in range(0, len(keys), 500):
+			chunk = keys[i:i + 500]
+			found.update(self.conn.execute(
+				f"SELECT song_key, id FROM songs WHERE song_key IN ({', '.join('?' for _ in chunk)})", chunk
+			))
+		return found
+
+	def _known_urls(self, urls):
+		# Dances already holding these URLs; where several share one (typed in by hand), the oldest
+		found = {}
+		urls = list(urls)
+		for i in range(0, len(urls), 500):
+			chunk = urls[i:i + 500]
+			found.update(self.conn.execute(
+				f"SELECT stepsheet_url, id FROM dances WHERE stepsheet_url IN ({', '.join('?' for _ in chunk)}) "
+				"ORDER BY id DESC", chunk
+			))
+		return found
+
+	def add(self, parsed, url=None):
+		self.pending.append((parsed, url))
+		if len(self.pending) >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		if not self.pending:
+			return
+		if self.song_ids is None:
+			self._load_songs()
+		batch, self.pending = self.pending, []
+		rows = [(dance_row(parsed, url), parsed) for parsed, url in batch]
+		# A URL repeated within the batch is written once, from its last stepsheet
+		last = {row['stepsheet_url']: i for i, (row, _) in enumerate(rows) if row['stepsheet_url']}
+		rows = [(row, parsed) for i, (row, parsed) in enumerate(rows) if last.get(row['stepsheet_url'], i) == i]
+		conn = self.conn
+		# IMMEDIATE takes the write lock now, so the ids read below stay ours
+		conn.execute("BEGIN IMMEDIATE")
+		with transaction(conn):
+			next_dance = conn.execute("SELECT coalesce(max(id), 0) FROM dances").fetchone()[0]
+			next_dance = max(next_dance, self._sequence('dances')) + 1
+			next_song = conn.execute("SELECT coalesce(max(id), 0) FROM songs").fetchone()[0]
+			next_song = max(next_song, self._sequence('songs')) + 1
+			known = self._known_urls(last)
+			dances, steps, songs, artists, links = [], [], [], [], []
+			new_keys = {}
+			batch_keys = {
+				song_key(song.get('title') or '', song.get('artist') or '')
+				for _, parsed in rows for song in parsed.get('songs', []) if (song.get('title') or '').strip()
+			}
+			self.song_ids.update(self._claimed_keys(batch_keys - self.song_ids.keys()))
+			for row, parsed in rows:
+				dance_id = known.get(row['stepsheet_url'])
+				if dance_id is None:
+					dance_id = next_dance
+					next_dance += 1
+				dances.append([dance_id] + [row[col] for col in self.DANCE_COLUMNS])
+				if parsed.get('steps'):
+					steps.append((dance_id, encode_steps(parsed['steps'])))
+				linked = set()
+				for song in parsed.get('songs', []):
+					title = (song.get('title') or '').strip()
+					if not title:
+						continue
+					artist = (song.get('artist') or '').strip()
+					key = song_key(title, artist)
+					song_id = self.song_ids.get(key) or new_keys.get(key)
+					if song_id is None:
+						song_id = next_song
+						next_song += 1
+						new_keys[key] = song_id
+						songs.append((song_id, title, key))
+						if artist:
+							artists.append((song_id, artist))
+					if song_id not in linked:
+						linked.add(song_id)
+						links.append((dance_id, song_id))
+			insert_songs(conn, songs, artists)
+			# Dances seen before get their links and steps replaced by the new stepsheet's
+			replaced = [(dance_id,) for dance_id in known.values()]
+			conn.executemany("DELETE FROM dance_songs WHERE dance_id = ?", replaced)
+			conn.executemany("DELETE FROM dance_steps WHERE dance_id = ?", replaced)
+			# Links first: the dances insert trigger then indexes each dance's songs in one go
+			conn.executemany("INSERT INTO dance_songs (dance_id, song_id) VALUES (?, ?)", links)
+			conn.executemany(
+				f"INSERT INTO dances (id, {', '.join(self.DANCE_COLUMNS)}) "
+				f"VALUES ({', '.join('?' for _ in range(len(self.DANCE_COLUMNS) + 1))}) "
+				f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in self.DANCE_COLUMNS)}",
+				dances
+			)
+			conn.executemany("INSERT INTO dance_steps (dance_id, data) VALUES (?, ?)", steps)
+		self.song_ids.update(new_keys)
+		self.dances_written += len(dances)
+		self.dances_updated += len(known)
+		self.songs_written += len(songs)
+
+	def _sequence(self, table):
+		row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,)).fetchone()
+		return row[0] if row else 0
+
+	def close(self):
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		if exc_type is None:
+			self.close()
+
+
+def ingest_stepsheets(records, batch_size=2000, conn=None):
+	"""
+	Write a stream of parsed stepsheets. Each record is either a parse_copperknob_page
+	dict or a scrapers.crawler result ({'url', 'data', 'error'}); failed crawls are skipped.
+	Returns the number of dances written (new and updated).
+	"""
+	with StepsheetIngester(conn, batch_size) as ingester:
+		for record in records:
+			if 'data' in record and 'url' in record:
+				if record.get('data'):
+					ingester.add(record['data'], record['url'])
+			else:
+				ingester.add(record)
+	return ingester.dances_written
+
+def _read_jsonl(stream):
+	for line in stream:
+		line = line.strip()
+		if line:
+			yield json.loads(line)
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Load parsed stepsheets (JSON lines, e.g. scrapers.crawler output) into the database.")
+	ap.add_argument("jsonl", help="JSON lines file ('-' for stdin)")
+	ap.add_argument("--batch-size", type=int, default=2000)
+	args = ap.parse_args(argv)
+	initialize_db()
+	if args.jsonl == '-':
+		written = ingest_stepsheets(_read_jsonl(sys.stdin), args.batch_size)
+	else:
+		with open(args.jsonl, encoding='utf-8') as f:
+			written = ingest_stepsheets(_read_jsonl(f), args.batch_size)
+	print(f"Imported {written} dances.")
+
+if __name__ == "__main__":
+	main()
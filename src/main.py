@@ -1,11 +1,23 @@
 import sys
 import signal
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QPushButton, QVBoxLayout, QWidget, QHBoxLayout, QMessageBox, QDialog
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTableView, QAbstractItemView, QLineEdit, QPushButton, QVBoxLayout, QWidget, QHBoxLayout, QMessageBox, QDialog
 from ui.add_dance_dialog import AddDanceDialog
-from scrapers.dance_scraper import scrape_dance_info
-from db.models import initialize_db, get_connection
+from ui.dance_table_model import DanceTableModel
+from ui.filter_panel import FilterPanel
+from db.models import initialize_db, get_connection, close_connections
+from db.dances import insert_dance, update_dance, delete_dances
+from db.search import search_dances
+from db.steps import load_steps, save_steps
+from timing import timed
 
 
+def scrape_dance_info(url):
+	# Imported on first fetch, on the fetch worker's thread: requests, cloudscraper and bs4
+	# take longer to load than the rest of the app, and most sessions never scrape
+	from scrapers.dance_scraper import scrape_dance_info
+	return scrape_dance_info(url)
+
 class MainWindow(QMainWindow):
 	def __init__(self):
 		super().__init__()
@@ -14,7 +26,25 @@ class MainWindow(QMainWindow):
 		# Layout with table and buttons
 		central = QWidget()
 		layout = QVBoxLayout()
-		self.table = QTableWidget()
+		# Search box; queries the full-text index shortly after typing stops
+		self.search_input = QLineEdit()
+		self.search_input.setPlaceholderText("Search dances, choreographers, songs, notes...")
+		self.search_input.setClearButtonEnabled(True)
+		self.search_timer = QTimer(self)
+		self.search_timer.setSingleShot(True)
+		self.search_timer.setInterval(150)
+		self.search_timer.timeout.connect(self.run_search)
+		self.search_input.textChanged.connect(self.search_timer.start)
+		layout.addWidget(self.search_input)
+		# Level/count/wall/BPM filters, applied in SQL by the model
+		self.filter_panel = FilterPanel()
+		self.filter_panel.filtersChanged.connect(self.apply_filters)
+		layout.addWidget(self.filter_panel)
+		self.model = DanceTableModel(self)
+		self.table = QTableView()
+		self.table.setModel(self.model)
+		self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+		self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
 		layout.addWidget(self.table)
 		btn_layout = QHBoxLayout()
 		self.add_btn = QPushButton("Add Dance")
@@ -31,18 +61,15 @@ class MainWindow(QMainWindow):
 		self.setCentralWidget(central)
 		self.load_dances()
 	def get_selected_row_id(self):
-		row = self.table.currentRow()
+		row = self.table.currentIndex().row()
 		if row < 0:
 			return None
-		# Get the dance name and choreographer to identify the row
-		name = self.table.item(row, 0).text() if self.table.item(row, 0) else None
-		choreo = self.table.item(row, 1).text() if self.table.item(row, 1) else None
-		conn = get_connection()
-		c = conn.cursor()
-		c.execute("SELECT id FROM dances WHERE name=? AND choreographer=?", (name, choreo))
-		result = c.fetchone()
-		conn.close()
-		return result[0] if result else None
+		# The model carries each row's dance id, so no lookup query is needed
+		return self.model.dance_id(row)
+
+	def get_selected_row_ids(self):
+		rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+		return [self.model.dance_id(row) for row in rows]
 
 	def edit_selected(self):
 		row_id = self.get_selected_row_id()
@@ -53,46 +80,10 @@ class MainWindow(QMainWindow):
 		c = conn.cursor()
 		c.execute("SELECT name, choreographer, release_date, level, count, wall, tag, restart, stepsheet_url, known_status, category, priority, action, notes FROM dances WHERE id=?", (row_id,))
 		data = c.fetchone()
-		conn.close()
 		if not data:
 			QMessageBox.warning(self, "Not Found", "Selected dance not found in database.")
 			return
-		def fetch_callback(url, dialog):
-			from scrapers.dance_scraper import scrape_dance_info
-			scraped = scrape_dance_info(url)
-			if scraped:
-				dialog.name_input.setText(scraped.get('dance_name', ''))
-				# Format choreographers list for display (just names, no countries)
-				choreos = scraped.get('choreographers', [])
-				if isinstance(choreos, list):
-					names = []
-					for c in choreos:
-						if isinstance(c, dict):
-							name = c.get('name', '')
-							if name and name.strip():
-								names.append(name.strip())
-					choreo_str = ', '.join(names)
-				else:
-					choreo_str = str(choreos).strip()
-				dialog.choreo_input.setText(choreo_str)
-
-				# Set release date if present
-				if hasattr(dialog, 'release_date_input'):
-					dialog.release_date_input.setText(scraped.get('release_date', ''))
-				dialog.level_input.setText(scraped.get('level', ''))
-				dialog.count_input.setText(scraped.get('count', ''))
-				dialog.wall_input.setText(scraped.get('wall', ''))
-				# Populate Songs field with all song info/switches
-				if hasattr(dialog, 'songs_input'):
-					songs = scraped.get('songs', [])
-					if songs:
-						song_lines = [f"{s['title']} - {s['artist']}" if s['artist'] else s['title'] for s in songs]
-						dialog.songs_input.setPlainText('\n'.join(song_lines))
-					else:
-						dialog.songs_input.setPlainText('')
-				dialog.notes_input.setPlainText(scraped.get('notes', ''))
-		from ui.add_dance_dialog import AddDanceDialog
-		dialog = AddDanceDialog(fetch_callback=fetch_callback, parent=self)
+		dialog = AddDanceDialog(fetch_func=scrape_dance_info, on_fetched=self.fill_from_scrape, parent=self)
 		dialog.name_input.setText(data[0])
 		dialog.choreo_input.setText(data[1])
 		if hasattr(dialog, 'release_date_input'):
@@ -108,74 +99,84 @@ class MainWindow(QMainWindow):
 		dialog.priority_combo.setCurrentText(data[11] or "")
 		dialog.action_combo.setCurrentText(data[12] or "")
 		dialog.notes_input.setPlainText(data[13] or "")
+		# Step sheets are only decompressed when a dance is opened
+		dialog.set_steps(load_steps(row_id))
 		if dialog.exec_():
-			# Save changes
-			conn = get_connection()
-			c = conn.cursor()
-			c.execute('''
-				UPDATE dances SET name=?, choreographer=?, level=?, count=?, wall=?, tag=?, restart=?, stepsheet_url=?, known_status=?, category=?, priority=?, action=?, notes=? WHERE id=?
-			''', (
-				dialog.name_input.text(),
-				dialog.choreo_input.text(),
-				dialog.level_input.text(),
-				dialog.count_input.text(),
-				dialog.wall_input.text(),
-				dialog.tag_input.text(),
-				dialog.restart_input.text(),
-				dialog.url_input.text(),
-				dialog.known_combo.currentText(),
-				dialog.category_combo.currentText(),
-				dialog.priority_combo.currentText(),
-				dialog.action_combo.currentText(),
-				dialog.notes_input.toPlainText(),
-				row_id
-			))
-			conn.commit()
-			conn.close()
-			self.load_dances()
+			# Save changes and repaint just this row
+			try:
+				update_dance(row_id, {
+					'name': dialog.name_input.text(),
+					'choreographer': dialog.choreo_input.text(),
+					'release_date': dialog.release_date_input.text() if hasattr(dialog, 'release_date_input') else '',
+					'level': dialog.level_input.text(),
+					'count': dialog.count_input.text(),
+					'wall': dialog.wall_input.text(),
+					'tag': dialog.tag_input.text(),
+					'restart': dialog.restart_input.text(),
+					'stepsheet_url': dialog.url_input.text(),
+					'known_status': dialog.known_combo.currentText(),
+					'category': dialog.category_combo.currentText(),
+					'priority': dialog.priority_combo.currentText(),
+					'action': dialog.action_combo.currentText(),
+					'notes': dialog.notes_input.toPlainText(),
+				})
+				if dialog.steps_changed:
+					save_steps(row_id, dialog.steps)
+				self.model.dance_changed(row_id)
+			except Exception as e:
+				QMessageBox.critical(self, "Error", f"Failed to save dance: {e}")
+
+	def fill_from_scrape(self, scraped, dialog):
+		# Called on the GUI thread once the dialog's background fetch finishes
+		dialog.name_input.setText(scraped.get('dance_name', ''))
+		# Format choreographers list for display (just names, no countries)
+		choreos = scraped.get('choreographers', [])
+		if isinstance(choreos, list):
+			names = []
+			for c in choreos:
+				if isinstance(c, dict):
+					name = c.get('name', '')
+					if name and name.strip():
+						names.append(name.strip())
+			choreo_str = ', '.join(names)
+		else:
+			choreo_str = str(choreos).strip()
+		dialog.choreo_input.setText(choreo_str)
+
+		# Set release date if present
+		if hasattr(dialog, 'release_date_input'):
+			dialog.release_date_input.setText(scraped.get('release_date', ''))
+		dialog.level_input.setText(scraped.get('level', ''))
+		dialog.count_input.setText(scraped.get('count', ''))
+		dialog.wall_input.setText(scraped.get('wall', ''))
+		# Populate Songs field with all song info/switches
+		if hasattr(dialog, 'songs_input'):
+			songs = scraped.get('songs', [])
+			if songs:
+				song_lines = [f"{s['title']} - {s['artist']}" if s['artist'] else s['title'] for s in songs]
+				dialog.songs_input.setPlainText('\n'.join(song_lines))
+			else:
+				dialog.songs_input.setPlainText('')
+		dialog.notes_input.setPlainText(scraped.get('notes', ''))
+		dialog.set_steps(scraped.get('steps', []), changed=True)
 
 	def delete_selected(self):
-		row_id = self.get_selected_row_id()
-		if row_id is None:
+		row_ids = self.get_selected_row_ids()
+		if not row_ids:
 			QMessageBox.warning(self, "No Selection", "Please select a dance to delete.")
 			return
-		reply = QMessageBox.question(self, "Confirm Delete", "Are you sure you want to delete this dance?", QMessageBox.Yes | QMessageBox.No)
+		if len(row_ids) == 1:
+			question = "Are you sure you want to delete this dance?"
+		else:
+			question = f"Are you sure you want to delete these {len(row_ids)} dances?"
+		reply = QMessageBox.question(self, "Confirm Delete", question, QMessageBox.Yes | QMessageBox.No)
 		if reply == QMessageBox.Yes:
-			conn = get_connection()
-			c = conn.cursor()
-			c.execute("DELETE FROM dances WHERE id=?", (row_id,))
-			conn.commit()
-			conn.close()
-			self.load_dances()
+			delete_dances(row_ids)
+			for row_id in row_ids:
+				self.model.dance_removed(row_id)
 
 	def open_add_dialog(self):
-		def fetch_callback(url, dialog):
-			scraped = scrape_dance_info(url)
-			if scraped:
-				dialog.name_input.setText(scraped.get('dance_name', ''))
-				choreos = scraped.get('choreographers', [])
-				if isinstance(choreos, list):
-					choreo_str = ', '.join(
-						c['name'] for c in choreos if isinstance(c, dict)
-					)
-				else:
-					choreo_str = str(choreos)
-				dialog.choreo_input.setText(choreo_str)
-				if hasattr(dialog, 'release_date_input'):
-					dialog.release_date_input.setText(scraped.get('release_date', ''))
-				dialog.level_input.setText(scraped.get('level', ''))
-				dialog.count_input.setText(scraped.get('count', ''))
-				dialog.wall_input.setText(scraped.get('wall', ''))
-				# Populate Songs field with all song info/switches
-				if hasattr(dialog, 'songs_input'):
-					songs = scraped.get('songs', [])
-					if songs:
-						song_lines = [f"{s['title']} - {s['artist']}" if s['artist'] else s['title'] for s in songs]
-						dialog.songs_input.setPlainText('\n'.join(song_lines))
-					else:
-						dialog.songs_input.setPlainText('')
-				dialog.notes_input.setPlainText(scraped.get('notes', ''))
-		dialog = AddDanceDialog(fetch_callback=fetch_callback, parent=self)
+		dialog = AddDanceDialog(fetch_func=scrape_dance_info, on_fetched=self.fill_from_scrape, parent=self)
 		result = dialog.exec_()
 		if result == QDialog.Accepted:
 			self.save_dance(dialog)
@@ -200,33 +201,36 @@ class MainWindow(QMainWindow):
 			QMessageBox.warning(dialog, "Missing Name", "Dance name is required.")
 			return
 		try:
-			conn = get_connection()
-			c = conn.cursor()
-			c.execute('''
-				INSERT INTO dances (name, choreographer, release_date, level, count, wall, tag, restart, stepsheet_url, known_status, category, priority, action, notes)
-				VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-			''', (
-				name, choreo, release_date, level, count, wall, tag, restart, url, known, category, priority, action, notes
-			))
-			conn.commit()
-			conn.close()
-			self.load_dances()
+			dance_id = insert_dance({
+				'name': name, 'choreographer': choreo, 'release_date': release_date, 'level': level,
+				'count': count, 'wall': wall, 'tag': tag, 'restart': restart, 'stepsheet_url': url,
+				'known_status': known, 'category': category, 'priority': priority, 'action': action,
+				'notes': notes,
+			})
+			if dialog.steps_changed:
+				save_steps(dance_id, dialog.steps)
+			self.model.dance_added(dance_id)
 		except Exception as e:
 			QMessageBox.critical(dialog, "Error", f"Failed to save dance: {e}")
 
+	@timed("ui.load_dances")
 	def load_dances(self):
-		conn = get_connection()
-		c = conn.cursor()
-		c.execute("SELECT name, choreographer, release_date, level, count, wall, tag, restart, known_status, category, priority, action FROM dances")
-		rows = c.fetchall()
-		headers = ["Name", "Choreographer", "Release Date", "Level", "Count", "Wall", "Tag", "Restart", "Known", "Category", "Priority", "Action"]
-		self.table.setRowCount(len(rows))
-		self.table.setColumnCount(len(headers))
-		self.table.setHorizontalHeaderLabels(headers)
-		for row_idx, row in enumerate(rows):
-			for col_idx, value in enumerate(row):
-				self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
-		conn.close()
+		# The model pages rows in from SQLite as the view scrolls, reading on its loader thread
+		self.model.reload()
+
+	@timed("ui.search")
+	def run_search(self):
+		text = self.search_input.text()
+		if not text.strip():
+			if self.model.is_searching():
+				self.load_dances()
+			return
+		self.model.show_search_results(search_dances(text))
+
+	def apply_filters(self, filters):
+		self.model.set_filters(filters)
+		if self.search_input.text().strip():
+			self.run_search()
 
 if __name__ == "__main__":
 	initialize_db()
@@ -235,4 +239,8 @@ if __name__ == "__main__":
 	signal.signal(signal.SIGINT, signal.SIG_DFL)
 	window = MainWindow()
 	window.show()
-	sys.exit(app.exec_())
+	exit_code = app.exec_()
+	# Let a page load still reading finish before its connection is closed
+	window.model.cancel_load(wait=True)
+	close_connections()
+	sys.exit(exit_code)
@@ -0,0 +1,4 @@
+import os
+
+# Per-user data (session cookies, page and Spotify caches), shared by every package
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".dancedb")
@@ -0,0 +1,48 @@
+import time
+import argparse
+import threading
+
+
+class TokenBucket:
+	"""
+	Thread-safe token bucket: `rate` tokens per second, holding at most `burst`.
+	"""
+	def __init__(self, rate, burst=1):
+		if rate <= 0:
+			raise ValueError(f"rate must be positive, got {rate}")
+		self.rate = rate
+		self.burst = burst
+		self.tokens = burst
+		self.updated = time.monotonic()
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		while True:
+			with self.lock:
+				now = time.monotonic()
+				self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+				self.updated = now
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+				wait_for = (1 - self.tokens) / self.rate
+			time.sleep(wait_for)
+
+	def pause(self, seconds):
+		"""
+		Hold off every caller for `seconds` (used when the host answers with Retry-After).
+		"""
+		with self.lock:
+			self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+def positive_rate(text):
+	"""
+	argparse type for --rate options: a number of requests per second above zero.
+	"""
+	try:
+		rate = float(text)
+	except ValueError:
+		raise argparse.ArgumentTypeError(f"invalid rate {text!r}")
+	if not rate > 0:
+		raise argparse.ArgumentTypeError(f"rate must be above 0, got {text}")
+	return rate
@@ -0,0 +1,208 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from scrapers.session import SESSION_DIR, get_session
+
+DEFAULT_CACHE_DIR = os.path.join(SESSION_DIR, "pages")
+DEFAULT_TTL = 7 * 24 * 3600  # serve without revalidating for a week
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheMiss(LookupError):
+	"""
+	Raised in offline mode when a URL has never been cached.
+	"""
+
+
+class PageCache:
+	"""
+	On-disk cache of stepsheet pages.
+	Bodies are stored once per distinct content under objects/<sha256>.html; an SQLite index
+	maps each URL to its body, ETag/Last-Modified validators and fetch/access times.
+	Entries younger than `ttl` are served as-is, older ones are revalidated with a
+	conditional GET, and the least recently used are evicted above `max_bytes`.
+	With `offline`, the network is never touched.
+	"""
+	def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+		self.directory = directory
+		self.ttl = ttl
+		self.max_bytes = max_bytes
+		self.offline = offline
+		self.lock = threading.Lock()
+		# Bytes of distinct bodies indexed, summed on first use and then kept by put/_drop_unreferenced
+		self._total_bytes = None
+		os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+		self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute('''
+			CREATE TABLE IF NOT EXISTS pages (
+				url TEXT PRIMARY KEY,
+				body_hash TEXT NOT NULL,
+				size INTEGER NOT NULL,
+				etag TEXT,
+				last_modified TEXT,
+				fetched_at REAL NOT NULL,
+				accessed_at REAL NOT NULL
+			)
+		''')
+		self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at)")
+		self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_body ON pages(body_hash)")
+		self.conn.commit()
+
+	def _object_path(self, body_hash):
+		return os.path.join(self.directory, "objects", body_hash[:2], body_hash + ".html")
+
+	def _read_body(self, body_hash):
+		with open(self._object_path(body_hash), encoding='utf-8') as f:
+			return f.read()
+
+	def _lookup(self, url):
+		with self.lock:
+			return self.conn.execute(
+				"SELECT body_hash, etag, last_modified, fetched_at FROM pages WHERE url=?", (url,)
+			).fetchone()
+
+	def _touch(self, url, fetched=False):
+		now = time.time()
+		with self.lock:
+			if fetched:
+				self.conn.execute("UPDATE pages SET accessed_at=?, fetched_at=? WHERE url=?", (now, now, url))
+			else:
+				self.conn.execute("UPDATE pages SET accessed_at=? WHERE url=?", (now, url))
+			self.conn.commit()
+
+	def get(self, url):
+		"""
+		Return the cached body for `url` without any network access, or None.
+		"""
+		entry = self._lookup(url)
+		if entry is None:
+			return None
+		try:
+			body = self._read_body(entry[0])
+		except OSError:
+			return None
+		self._touch(url)
+		return body
+
+	def _stored_bytes(self):
+		# Caller holds self.lock
+		if self._total_bytes is None:
+			self._total_bytes = self.conn.execute(
+				"SELECT coalesce(sum(size), 0) FROM (SELECT DISTINCT body_hash, size FROM pages)"
+			).fetchone()[0]
+		return self._total_bytes
+
+	def put(self, url, body, etag=None, last_modified=None):
+		data = body.encode('utf-8')
+		body_hash = hashlib.sha256(data).hexdigest()
+		path = self._object_path(body_hash)
+		if not os.path.exists(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			tmp = f"{path}.{threading.get_ident()}.tmp"
+			with open(tmp, 'wb') as f:
+				f.write(data)
+			os.replace(tmp, path)
+		now = time.time()
+		with self.lock:
+			self._stored_bytes()
+			old = self.conn.execute("SELECT body_hash, size FROM pages WHERE url=?", (url,)).fetchone()
+			known = self.conn.execute("SELECT 1 FROM pages WHERE body_hash=? LIMIT 1", (body_hash,)).fetchone()
+			self.conn.execute(
+				"INSERT OR REPLACE INTO pages (url, body_hash, size, etag, last_modified, fetched_at, accessed_at) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?)",
+				(url, body_hash, len(data), etag, last_modified, now, now)
+			)
+			if not known:
+				self._total_bytes += len(data)
+			if old and old[0] != body_hash:
+				self._drop_unreferenced(old[0], old[1])
+			self.conn.commit()
+			over = self._total_bytes > self.max_bytes
+		if over:
+			self.evict()
+
+	def _drop_unreferenced(self, body_hash, size):
+		"""
+		Delete a body file of `size` bytes once no URL points at it. Caller holds self.lock.
+		Returns True if deleted.
+		"""
+		if self.conn.execute("SELECT 1 FROM pages WHERE body_hash=? LIMIT 1", (body_hash,)).fetchone():
+			return False
+		self._total_bytes -= size
+		try:
+			os.remove(self._object_path(body_hash))
+		except OSError:
+			pass
+		return True
+
+	def evict(self):
+		"""
+		Drop least recently used pages until the stored bodies fit in max_bytes.
+		"""
+		with self.lock:
+			if self._stored_bytes() <= self.max_bytes:
+				return
+			for url, body_hash, size in self.conn.execute(
+				"SELECT url, body_hash, size FROM pages ORDER BY accessed_at"
+			).fetchall():
+				self.conn.execute("DELETE FROM pages WHERE url=?", (url,))
+				self._drop_unreferenced(body_hash, size)
+				if self._total_bytes <= self.max_bytes:
+					break
+			self.conn.commit()
+
+	def fresh(self, url):
+		"""
+		Return the cached body if it can be served without asking the server (younger
+		than ttl, or any age when offline), else None.
+		"""
+		entry = self._lookup(url)
+		if entry is not None and (self.offline or time.time() - entry[3] < self.ttl):
+			return self.get(url)
+		return None
+
+	def fetch(self, url, timeout=15):
+		"""
+		Return the page text for `url`, from the cache when fresh, otherwise via a
+		conditional GET (a 304 reuses the cached body). Raises CacheMiss when offline
+		and the page is not cached, and HTTP/network errors like fetch_page.
+		"""
+		body = self.fresh(url)
+		if body is not None:
+			return body
+		if self.offline:
+			raise CacheMiss(url)
+		entry = self._lookup(url)
+		headers = {}
+		if entry is not None:
+			if entry[1]:
+				headers['If-None-Match'] = entry[1]
+			if entry[2]:
+				headers['If-Modified-Since'] = entry[2]
+		resp = get_session().get(url, headers=headers, timeout=timeout)
+		if resp.status_code == 304 and entry is not None:
+			try:
+				body = self._read_body(entry[0])
+				self._touch(url, fetched=True)
+				return body
+			except OSError:
+				# Body went missing; fetch it again unconditionally
+				resp = get_session().get(url, timeout=timeout)
+		resp.raise_for_status()
+		body = resp.text
+		self.put(url, body, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+		return body
+
+	def urls(self):
+		"""
+		Every cached URL, e.g. to re-parse the whole corpus offline.
+		"""
+		with self.lock:
+			return [row[0] for row in self.conn.execute("SELECT url FROM pages ORDER BY url")]
+
+	def close(self):
+		with self.lock:
+			self.conn.close()
@@ -0,0 +1,170 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from ratelimit import TokenBucket, positive_rate
+from scrapers.dance_scraper import fetch_page, parse_copperknob_page
+from scrapers.session import save_session
+from scrapers.cache import PageCache, CacheMiss, DEFAULT_CACHE_DIR
+
+# HTTP statuses worth retrying; anything else in the 4xx range is a permanent failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+	"""
+	One TokenBucket per host, created on first use.
+	"""
+	def __init__(self, rate, burst=1):
+		self.rate = rate
+		self.burst = burst
+		self.buckets = {}
+		self.lock = threading.Lock()
+
+	def bucket(self, url):
+		host = urlsplit(url).netloc.lower()
+		with self.lock:
+			if host not in self.buckets:
+				self.buckets[host] = TokenBucket(self.rate, self.burst)
+			return self.buckets[host]
+
+
+def _retry_after(error):
+	response = getattr(error, 'response', None)
+	if response is None:
+		return None
+	try:
+		return float(response.headers.get('Retry-After', ''))
+	except ValueError:
+		return None
+
+def _is_retryable(error):
+	if isinstance(error, requests.HTTPError) and error.response is not None:
+		return error.response.status_code in RETRY_STATUSES
+	return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+def fetch_with_retry(url, limiter, retries=3, backoff=1.0, timeout=15, fetch=fetch_page):
+	"""
+	Fetch one page, waiting for the host's rate limit before every attempt and retrying
+	transient failures with exponential backoff (plus jitter). Raises the last error.
+	"""
+	bucket = limiter.bucket(url)
+	for attempt in range(retries + 1):
+		bucket.acquire()
+		try:
+			return fetch(url, timeout=timeout)
+		except Exception as e:
+			if attempt == retries or not _is_retryable(e):
+				raise
+			delay = _retry_after(e)
+			if delay is not None:
+				bucket.pause(delay)
+			else:
+				time.sleep(backoff * (2 ** attempt) * (1 + random.random() / 2))
+
+def _crawl_one(url, limiter, retries, backoff, timeout, parser, cache):
+	try:
+		# Fresh cache hits skip the rate limiter entirely
+		html = cache.fresh(url) if cache is not None else None
+		if html is None and cache is not None and cache.offline:
+			raise CacheMiss(url)
+		if html is None:
+			fetch = cache.fetch if cache is not None else fetch_page
+			html = fetch_with_retry(url, limiter, retries=retries, backoff=backoff, timeout=timeout, fetch=fetch)
+		return {'url': url, 'data': parse_copperknob_page(html, parser=parser), 'error': None}
+	except Exception as e:
+		return {'url': url, 'data': None, 'error': str(e)}
+
+def crawl(urls, workers=8, rate=1.0, burst=1, max_in_flight=None, retries=3, backoff=1.0, timeout=15, parser=None, cache=None):
+	"""
+	Fetch and parse many stepsheet URLs concurrently.
+	`rate`/`burst` limit requests per host per second; at most `max_in_flight` URLs
+	(default 2 * workers) are queued at once, so `urls` can be an arbitrarily long iterator.
+	Yields {'url', 'data', 'error'} dicts in completion order; `data` is the
+	parse_copperknob_page dict, or None with `error` set when the URL failed.
+	Pass a scrapers.cache.PageCache as `cache` to reuse and revalidate stored pages.
+	"""
+	limiter = HostRateLimiter(rate, burst)
+	max_in_flight = max_in_flight or workers * 2
+	pending = set()
+	pool = ThreadPoolExecutor(max_workers=workers)
+	try:
+		for url in urls:
+			if len(pending) >= max_in_flight:
+				done, pending = wait(pending, return_when=FIRST_COMPLETED)
+				for future in done:
+					yield future.result()
+			pending.add(pool.submit(_crawl_one, url, limiter, retries, backoff, timeout, parser, cache))
+		while pending:
+			done, pending = wait(pending, return_when=FIRST_COMPLETED)
+			for future in done:
+				yield future.result()
+	finally:
+		# On an early close or Ctrl+C, queued URLs are dropped; only those already running finish
+		pool.shutdown(wait=True, cancel_futures=True)
+		save_session()
+
+def read_url_file(path):
+	"""
+	Yield URLs from a text file, one per line; blank lines and # comments are skipped.
+	"""
+	with open(path, encoding='utf-8') as f:
+		for line in f:
+			line = line.strip()
+			if line and not line.startswith('#'):
+				yield line
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Fetch and parse many CopperKnob stepsheets concurrently.")
+	ap.add_argument("url_file", nargs='?', help="text file with one stepsheet URL per line ('-' for stdin)")
+	ap.add_argument("-o", "--output", help="write JSON lines here instead of stdout")
+	ap.add_argument("--workers", type=int, default=8)
+	ap.add_argument("--rate", type=positive_rate, default=1.0, help="requests per second per host")
+	ap.add_argument("--burst", type=int, default=1)
+	ap.add_argument("--retries", type=int, default=3)
+	ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="on-disk page cache location")
+	ap.add_argument("--no-cache", action="store_true", help="always download, never store pages")
+	ap.add_argument("--offline", action="store_true", help="serve only cached pages; never touch the network")
+	ap.add_argument("--ttl", type=float, help="seconds a cached page is served without revalidation")
+	ap.add_argument("--from-cache", action="store_true", help="re-parse every cached page offline instead of reading url_file")
+	args = ap.parse_args(argv)
+	if not args.url_file and not args.from_cache:
+		ap.error("a url_file or --from-cache is required")
+
+	cache = None
+	if not args.no_cache:
+		cache = PageCache(args.cache_dir, offline=args.offline or args.from_cache)
+		if args.ttl is not None:
+			cache.ttl = args.ttl
+	if args.from_cache:
+		if cache is None:
+			ap.error("--from-cache cannot be combined with --no-cache")
+		urls = cache.urls()
+	elif args.url_file == '-':
+		urls = (line.strip() for line in sys.stdin if line.strip() and not line.startswith('#'))
+	else:
+		urls = read_url_file(args.url_file)
+	out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+	ok = failed = 0
+	try:
+		for result in crawl(urls, workers=args.workers, rate=args.rate, burst=args.burst, retries=args.retries, cache=cache):
+			out.write(json.dumps(result, ensure_ascii=False) + '\n')
+			if result['error']:
+				failed += 1
+				print(f"Error scraping {result['url']}: {result['error']}", file=sys.stderr)
+			else:
+				ok += 1
+	finally:
+		if out is not sys.stdout:
+			out.close()
+		if cache is not None:
+			cache.close()
+	print(f"Fetched {ok} stepsheets, {failed} failed.", file=sys.stderr)
+
+if __name__ == "__main__":
+	main()
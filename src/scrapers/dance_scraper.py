@@ -1,16 +1,288 @@
+import re
 import requests
-import cloudscraper
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from scrapers.session import get_session
+from timing import timed
 
-def parse_copperknob_html(filepath):
+# Parser backends, fastest first. 'lxml-xpath' builds and searches the tree with lxml alone;
+# 'lxml' and 'html.parser' are BeautifulSoup builders. All return the same dict.
+try:
+	from lxml import etree, html as lxml_html
+	HTML_PARSER = 'lxml-xpath'
+except ImportError:
+	etree = lxml_html = None
+	HTML_PARSER = 'html.parser'
+PARSER_BACKENDS = ('lxml-xpath', 'lxml', 'html.parser')
+
+# The only page containers parse_copperknob_page reads
+_SHEET_CLASSES = {
+	'sheetinfochoregrapher', 'sheetinfocount', 'sheetinfowall', 'sheetinfolevel',
+	'sheetinfomusic', 'sheetcontent',
+}
+
+def _wanted_tag(name, attrs):
+	if name == 'h2':
+		return 'style' in attrs
+	if name == 'meta':
+		return attrs.get('name') == 'title'
+	if name == 'div':
+		classes = attrs.get('class') or ''
+		if isinstance(classes, str):
+			classes = classes.split()
+		return not _SHEET_CLASSES.isdisjoint(classes)
+	return False
+
+# Tags whose text BeautifulSoup leaves out of get_text()
+_NON_TEXT_TAGS = {'script', 'style', 'template'}
+
+def _lxml_strings(el):
+	# Text nodes under an lxml element in document order, as bs4's .strings yields them
+	if isinstance(el.tag, str) and el.tag not in _NON_TEXT_TAGS:
+		if el.text:
+			yield el.text
+		for child in el:
+			yield from _lxml_strings(child)
+			if child.tail:
+				yield child.tail
+
+def _lxml_stripped(el):
+	return [t.strip() for t in _lxml_strings(el) if t.strip()]
+
+def _lxml_text(el, separator=''):
+	# Same as bs4's get_text(separator=..., strip=True)
+	return separator.join(_lxml_stripped(el))
+
+def _lxml_classes(el):
+	return (el.get('class') or '').split()
+
+def _lxml_first_div(root, cls):
+	found = root.xpath(f"//div[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]")
+	return found[0] if found else None
+
+def _lxml_next_sibling_text(el):
+	"""
+	str() of bs4's next_sibling for an element: its tail text if any, otherwise the
+	following node (a comment's text, or a tag's markup as bs4 would print it).
+	"""
+	if el.tail:
+		return el.tail
+	nxt = el.getnext()
+	if nxt is None:
+		return ''
+	if not isinstance(nxt.tag, str):
+		return nxt.text or ''
+	markup = etree.tostring(nxt, encoding='unicode', method='html', with_tail=False)
+	return str(BeautifulSoup(markup, 'html.parser').contents[0])
+
+def _parse_copperknob_lxml(html):
+	"""
+	lxml-only implementation of parse_copperknob_page: the tree is built and searched in C,
+	and only the handful of fields we need are walked in Python. Mirrors the bs4 code below.
+	"""
+	try:
+		root = lxml_html.fromstring(html)
+	except ValueError:
+		# lxml refuses str input that carries an XML encoding declaration
+		root = lxml_html.fromstring(html.encode('utf-8'))
+
+	dance_name = ''
+	h2s = root.xpath('//h2[@style]')
+	if h2s:
+		dance_name = _lxml_text(h2s[0])
+	if not dance_name:
+		metas = root.xpath("//meta[@name='title']")
+		if metas and metas[0].get('content'):
+			dance_name = metas[0].get('content')
+
+	choreographers = []
+	release_date = ''
+	choreo_div = _lxml_first_div(root, 'sheetinfochoregrapher')
+	if choreo_div is not None:
+		for span in choreo_div.iterdescendants('span'):
+			for part in _lxml_stripped(span):
+				date = _parse_choreographer_part(part, choreographers)
+				if date:
+					release_date = date
+
+	def first_span_text(cls):
+		div = _lxml_first_div(root, cls)
+		if div is None:
+			return ''
+		span = next(div.iterdescendants('span'), None)
+		return _lxml_text(span) if span is not None else ''
+
+	count = first_span_text('sheetinfocount')
+	wall = first_span_text('sheetinfowall')
+
+	level = ''
+	level_div = _lxml_first_div(root, 'sheetinfolevel')
+	if level_div is not None:
+		tag = next((d for d in level_div.iterdescendants('div') if 'leveltag' in _lxml_classes(d)), None)
+		if tag is not None:
+			level = _lxml_text(tag)
+
+	songs = []
+	music_div = _lxml_first_div(root, 'sheetinfomusic')
+	if music_div is not None:
+		for span in music_div.iterdescendants('span'):
+			for a_tag in span.iterdescendants('a'):
+				artist = _artist_after_link(_lxml_next_sibling_text(a_tag))
+				if not artist:
+					span_text = _lxml_text(span, ' ')
+					if ' - ' in span_text:
+						artist = span_text.split(' - ', 1)[-1].strip()
+				songs.append({'title': _lxml_text(a_tag), 'artist': artist})
+		if not songs:
+			for a_tag in music_div.iterdescendants('a'):
+				artist = _artist_after_link(_lxml_next_sibling_text(a_tag))
+				songs.append({'title': _lxml_text(a_tag), 'artist': artist})
+
+	steps = []
+	content = _lxml_first_div(root, 'sheetcontent')
+	if content is not None:
+		current_section = ''
+		for elem in content:
+			if elem.tag != 'span':
+				continue
+			classes = _lxml_classes(elem)
+			if 'title' in classes:
+				current_section = _lxml_text(elem)
+			elif 'step' in classes:
+				desc_el = next((sib for sib in elem.itersiblings('span') if 'desc' in _lxml_classes(sib)), None)
+				desc = _lxml_text(desc_el) if desc_el is not None else ''
+				steps.append({'section': current_section, 'step': _lxml_text(elem), 'desc': desc})
+
+	return {
+		'dance_name': dance_name,
+		# The bs4 loop reuses `title` for song titles, so it ends up as the last song's title
+		'title': songs[-1]['title'] if songs else dance_name,
+		'choreographers': choreographers,
+		'release_date': release_date,
+		'count': count,
+		'wall': wall,
+		'level': level,
+		'song_title': songs[0]['title'] if songs else '',
+		'song_artist': songs[0]['artist'] if songs else '',
+		'songs': songs,
+		'steps': steps
+	}
+
+class _SheetStrainer(SoupStrainer):
+	"""
+	Builds only the dance-name heading, the title meta tag and the sheetinfo*/sheetcontent
+	divs (with everything inside them), skipping the rest of the page.
+	"""
+	# bs4 >= 4.13
+	def allow_tag_creation(self, nsprefix, name, attrs):
+		return _wanted_tag(name, attrs or {})
+
+	def allow_string_creation(self, string):
+		return False
+
+	# bs4 < 4.13
+	def search_tag(self, markup_name=None, markup_attrs={}):
+		if isinstance(markup_name, str):
+			return markup_name if _wanted_tag(markup_name, dict(markup_attrs or {})) else None
+		return super().search_tag(markup_name, markup_attrs)
+
+_MONTH_LIST = [
+	'january', 'february', 'march', 'april', 'may', 'june',
+	'july', 'august', 'september', 'october', 'november', 'december',
+]
+# Full and abbreviated month names -> month number
+_MONTHS = {name: number for number, month in enumerate(_MONTH_LIST, start=1) for name in (month, month[:3])}
+_MONTHS['sept'] = 9
+_MONTH_NAMES = '|'.join(sorted(_MONTHS, key=len, reverse=True))
+# A release date: "March 2019", "15th March 2019", "Mar 15, 2019"
+_RELEASE_DATE = re.compile(
+	rf'''\b(?:
+		(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?P<month>{_MONTH_NAMES})\.?,?\s+(?P<year>\d{{4}})
+		| (?P<month2>{_MONTH_NAMES})\.?\s+(?:(?P<day2>\d{{1,2}})(?:st|nd|rd|th)?,?\s+)?(?P<year2>\d{{4}})
+	)\b''',
+	re.IGNORECASE | re.VERBOSE
+)
+# A year on its own ("- 2014"), when no month is given
+_RELEASE_YEAR = re.compile(r'\b(?P<year>(?:19|20)\d{2})\b')
+# What remains is names, "(Country)" and separators (&, comma, the word "and")
+_CHOREO_TOKEN = re.compile(r'\((?P<country>[^()]*)\)|(?P<names>[^(),&]+)')
+_AND = re.compile(r'\band\b')
+# Fragments without any of these are a single bare name, the common case
+_NEEDS_TOKENIZING = re.compile(r'[(),&\d]|\band\b')
+
+def _iso_date(match):
+	month = _MONTHS[(match.group('month') or match.group('month2')).lower()]
+	year = match.group('year') or match.group('year2')
+	day = match.group('day') or match.group('day2')
+	if day and 1 <= int(day) <= 31:
+		return f"{year}-{month:02d}-{int(day):02d}"
+	return f"{year}-{month:02d}"
+
+def _parse_choreographer_part(part, choreographers):
+	"""
+	Parse one text fragment of the choreographer field, appending {'name', 'country'}
+	dicts to `choreographers`. Returns the release date in the fragment as an ISO date
+	("2019-03" or "2019-03-15", or "2019" for a bare year), else ''.
+	"""
+	if not _NEEDS_TOKENIZING.search(part):
+		name = part.strip(' -\t\n')
+		if name:
+			choreographers.append({'name': name, 'country': ''})
+		return ''
+	release_date = ''
+	date = _RELEASE_DATE.search(part)
+	if date:
+		release_date = _iso_date(date)
+	else:
+		date = _RELEASE_YEAR.search(part)
+		if date:
+			release_date = date.group('year')
+	if date:
+		part = part[:date.start()] + ' ' + part[date.end():]
+	for token in _CHOREO_TOKEN.finditer(part):
+		names, country = token.group('names'), token.group('country')
+		if names is not None:
+			for name in (_AND.split(names) if 'and' in names else (names,)):
+				name = name.strip(' -\t\n')
+				# Leftover numbers (a stray day or count) are not names
+				if name and not name.replace(' ', '').isdigit():
+					choreographers.append({'name': name, 'country': ''})
+		elif choreographers and not choreographers[-1]['country']:
+			# "(Country)" belongs to the choreographer before it; orphans are ignored
+			choreographers[-1]['country'] = country.strip()
+	return release_date
+
+def _artist_after_link(text):
+	# Artist text following a song link: usually ' - Artist', sometimes just 'Artist'
+	if ' - ' in text:
+		return text.split(' - ', 1)[-1].strip()
+	return text.strip()
+
+@timed("scrape.parse_file")
+def parse_copperknob_html(filepath, parser=None, strain=True):
 	"""
-	Parse a CopperKnob HTML file and extract:
+	Parse a saved CopperKnob HTML file. See parse_copperknob_page for the returned dict.
+	"""
+	with open(filepath, encoding='utf-8') as f:
+		return parse_copperknob_page(f.read(), parser=parser, strain=strain)
+
+@timed("scrape.parse")
+def parse_copperknob_page(html, parser=None, strain=True):
+	"""
+	Parse a CopperKnob stepsheet page and extract:
 	title, choreographer, count, wall, level, music (title/artist), step sheet instructions.
+	`html` may be a str, bytes or an already-built BeautifulSoup tree.
+	`parser` is one of PARSER_BACKENDS (default HTML_PARSER); with `strain`, the bs4
+	backends only build the containers read below. Every combination returns the same dict.
 	Returns a dict with these fields.
 	"""
-	with open(filepath, encoding='utf-8') as f:
-		html = f.read()
-	soup = BeautifulSoup(html, 'html.parser')
+	parser = parser or HTML_PARSER
+	if isinstance(html, BeautifulSoup):
+		soup = html
+	elif parser == 'lxml-xpath':
+		return _parse_copperknob_lxml(html)
+	else:
+		parse_only = _SheetStrainer() if strain else None
+		soup = BeautifulSoup(html, parser, parse_only=parse_only)
 
 
 	# Dance Name (from h2.sectionbar or meta title)
@@ -34,36 +306,9 @@ def parse_copperknob_html(filepath):
 		choreo_spans = choreo_tag.find_all('span')
 		for span in choreo_spans:
 			for part in span.stripped_strings:
-				import re
-				choreo_entries = re.split(r'\s*(?:&|and|,)\s*', part)
-				# If the last entry looks like a release date, extract it
-				if choreo_entries:
-					last_entry = choreo_entries[-1].strip()
-					months = [
-						'January','February','March','April','May','June','July','August','September','October','November','December']
-					if any(month in last_entry for month in months):
-						# Remove any leading dash or whitespace
-						release_date = last_entry.lstrip('-').strip()
-						choreo_entries = choreo_entries[:-1]
-				for entry in choreo_entries:
-					entry = entry.strip()
-					if not entry:
-						continue
-					# If entry is just a country (e.g., (Australia)), assign to previous choreographer
-					if entry.startswith('(') and entry.endswith(')'):
-						country_part = entry[1:-1].strip()
-						if choreographers and not choreographers[-1]['country']:
-							choreographers[-1]['country'] = country_part
-						# else: ignore orphan country
-					# If entry is Name (Country)
-					elif '(' in entry and entry.endswith(')'):
-						name_part = entry[:entry.rfind('(')].strip()
-						country_part = entry[entry.rfind('(')+1:-1].strip()
-						if name_part:
-							choreographers.append({'name': name_part, 'country': country_part})
-					# If entry is just a name
-					else:
-						choreographers.append({'name': entry, 'country': ''})
+				date = _parse_choreographer_part(part, choreographers)
+				if date:
+					release_date = date
 
 	# Count
 	count = ''
@@ -107,13 +352,7 @@ def parse_copperknob_html(filepath):
 				next_sibling = a_tag.next_sibling
 				artist = ''
 				if next_sibling:
-					# Sometimes artist is after ' - '
-					text = str(next_sibling)
-					if ' - ' in text:
-						artist = text.split(' - ', 1)[-1].strip()
-					else:
-						# Sometimes artist is just after the <a>
-						artist = text.strip()
+					artist = _artist_after_link(str(next_sibling))
 				# If artist is still empty, try to get from span text
 				if not artist:
 					span_text = span.get_text(separator=' ', strip=True)
@@ -128,11 +367,7 @@ def parse_copperknob_html(filepath):
 				next_sibling = a_tag.next_sibling
 				artist = ''
 				if next_sibling:
-					text = str(next_sibling)
-					if ' - ' in text:
-						artist = text.split(' - ', 1)[-1].strip()
-					else:
-						artist = text.strip()
+					artist = _artist_after_link(str(next_sibling))
 				songs.append({'title': title, 'artist': artist})
 	# Backward compatibility: also set song_title and song_artist for main song
 	song_title = songs[0]['title'] if songs else ''
@@ -169,6 +404,22 @@ def parse_copperknob_html(filepath):
 		'steps': steps
 	}
 
+@timed("scrape.fetch")
+def fetch_page(url, timeout=15, cache=None):
+	"""
+	Download a stepsheet page with this thread's scraper session and return its text.
+	With a scrapers.cache.PageCache, fresh copies are served from disk and stale ones revalidated.
+	Raises on network errors and HTTP error statuses.
+	"""
+	if cache is not None:
+		return cache.fetch(url, timeout=timeout)
+	# Reuse this thread's cloudscraper session (keep-alive, shared Cloudflare cookies)
+	scraper = get_session()
+	resp = scraper.get(url, timeout=timeout)
+	resp.raise_for_status()
+	return resp.text
+
+@timed("scrape.total")
 def scrape_dance_info(url):
 	"""
 	Scrape dance info from a stepsheet web page.
@@ -176,17 +427,8 @@ def scrape_dance_info(url):
 	Returns a dict with keys: name, choreographer, level, notes
 	"""
 	try:
-		# Use cloudscraper to bypass Cloudflare protection
-		scraper = cloudscraper.create_scraper()
-		resp = scraper.get(url, timeout=15)
-		resp.raise_for_status()
-		# Save to a temporary file and parse with the same logic as parse_copperknob_html
-		import tempfile
-		with tempfile.NamedTemporaryFile('w+', encoding='utf-8', delete=False, suffix='.html') as tmp:
-			tmp.write(resp.text)
-			tmp.flush()
-			result = parse_copperknob_html(tmp.name)
-		return result
+		# Parse straight from the response body
+		return parse_copperknob_page(fetch_page(url))
 	except Exception as e:
 		print(f"Error scraping {url}: {e}")
 		return None
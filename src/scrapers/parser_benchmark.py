@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import bs4
+from bs4 import BeautifulSoup
+from scrapers.dance_scraper import (
+	PARSER_BACKENDS, parse_copperknob_page, etree, lxml_html, _SheetStrainer, _lxml_first_div, _lxml_text,
+)
+
+DEFAULT_CORPUS = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'copperknob_real.html'))
+
+# Page container each output field is read from, for the per-field costs
+FIELD_CONTAINERS = {
+	'choreographers': 'sheetinfochoregrapher',
+	'count': 'sheetinfocount',
+	'wall': 'sheetinfowall',
+	'level': 'sheetinfolevel',
+	'songs': 'sheetinfomusic',
+	'steps': 'sheetcontent',
+}
+
+
+def load_corpus(paths=(), cache_dir=None):
+	"""
+	Return [(name, html)] from .html files and directories of them, plus every page in a
+	scrapers.cache.PageCache directory if `cache_dir` is given.
+	"""
+	corpus = []
+	for path in paths:
+		if os.path.isdir(path):
+			files = sorted(
+				os.path.join(root, name) for root, _, names in os.walk(path)
+				for name in names if name.endswith(('.html', '.htm'))
+			)
+		else:
+			files = [path]
+		for filename in files:
+			with open(filename, encoding='utf-8') as f:
+				corpus.append((filename, f.read()))
+	if cache_dir:
+		from scrapers.cache import PageCache
+		cache = PageCache(cache_dir, offline=True)
+		try:
+			for url in cache.urls():
+				html = cache.get(url)
+				if html is not None:
+					corpus.append((url, html))
+		finally:
+			cache.close()
+	return corpus
+
+def available_backends():
+	return [b for b in PARSER_BACKENDS if lxml_html is not None or not b.startswith('lxml')]
+
+def _build_tree(html, backend):
+	if backend == 'lxml-xpath':
+		return lxml_html.fromstring(html)
+	return BeautifulSoup(html, backend, parse_only=_SheetStrainer())
+
+def _field_text(tree, backend, cls):
+	if backend == 'lxml-xpath':
+		div = _lxml_first_div(tree, cls)
+		return _lxml_text(div) if div is not None else ''
+	div = tree.find('div', class_=cls)
+	return div.get_text(strip=True) if div is not None else ''
+
+def check_equivalence(corpus, backends):
+	"""
+	Parse every page with every backend (and unstrained bs4) and compare against the
+	unstrained html.parser result. Returns a list of {'page', 'backend', 'fields'} mismatches.
+	"""
+	mismatches = []
+	for name, html in corpus:
+		expected = parse_copperknob_page(html, parser='html.parser', strain=False)
+		variants = [(b, True) for b in backends] + [(b, False) for b in backends if b != 'lxml-xpath']
+		for backend, strain in variants:
+			got = parse_copperknob_page(html, parser=backend, strain=strain)
+			if got != expected:
+				fields = sorted(k for k in set(got) | set(expected) if got.get(k) != expected.get(k))
+				label = backend if strain else f"{backend} (unstrained)"
+				mismatches.append({'page': name, 'backend': label, 'fields': fields})
+	return mismatches
+
+def _seconds_per_pass(func, rounds, min_time=0.2):
+	"""
+	Best time for one call of `func` over `rounds` rounds, each looping func for at
+	least `min_time` seconds so small corpora still give stable numbers.
+	"""
+	loops = 1
+	while True:
+		start = time.perf_counter()
+		for _ in range(loops):
+			func()
+		elapsed = time.perf_counter() - start
+		if elapsed >= min_time:
+			break
+		loops *= 2
+	best = elapsed / loops
+	for _ in range(rounds - 1):
+		start = time.perf_counter()
+		for _ in range(loops):
+			func()
+		best = min(best, (time.perf_counter() - start) / loops)
+	return best
+
+def measure_backend(corpus, backend, rounds=5):
+	"""
+	Timings for one backend: full-parse pages/second (best round), tree building
+	versus extraction, tracemalloc peak for one pass (Python allocations only; lxml's C
+	trees are not seen), and per-field cost in microseconds
+	per page (finding a field's container and reading its text on a built tree).
+	"""
+	pages = [html for _, html in corpus]
+	parse = _seconds_per_pass(lambda: [parse_copperknob_page(h, parser=backend) for h in pages], rounds)
+	build = _seconds_per_pass(lambda: [_build_tree(h, backend) for h in pages], rounds)
+
+	tracemalloc.start()
+	for html in pages:
+		parse_copperknob_page(html, parser=backend)
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	trees = [_build_tree(h, backend) for h in pages]
+	fields = {}
+	for field, cls in FIELD_CONTAINERS.items():
+		seconds = _seconds_per_pass(lambda: [_field_text(t, backend, cls) for t in trees], rounds)
+		fields[field] = seconds / len(pages) * 1e6
+	return {
+		'pages_per_sec': len(pages) / parse if parse else None,
+		'ms_per_page': parse / len(pages) * 1e3,
+		'build_ms_per_page': build / len(pages) * 1e3,
+		'extract_ms_per_page': max(parse - build, 0) / len(pages) * 1e3,
+		'peak_memory_kb': peak / 1024,
+		'field_us_per_page': fields,
+	}
+
+def run_benchmark(corpus, backends=None, rounds=5):
+	backends = backends or available_backends()
+	results = {
+		'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'bs4': bs4.__version__,
+		'lxml': etree.__version__ if etree is not None else None,
+		'pages': len(corpus),
+		'bytes': sum(len(h) for _, h in corpus),
+		'rounds': rounds,
+		'mismatches': check_equivalence(corpus, backends),
+		'backends': {},
+	}
+	for backend in backends:
+		results['backends'][backend] = measure_backend(corpus, backend, rounds)
+	return results
+
+def find_regressions(results, baseline, tolerance=0.2):
+	"""
+	Compare against an earlier results dict: a backend regresses when its throughput drops,
+	or its peak memory grows, by more than `tolerance`. Returns messages.
+	"""
+	problems = []
+	for backend, now in results['backends'].items():
+		before = baseline.get('backends', {}).get(backend)
+		if not before:
+			continue
+		if before.get('pages_per_sec') and now['pages_per_sec'] < before['pages_per_sec'] * (1 - tolerance):
+			problems.append(f"{backend}: {now['pages_per_sec']:.1f} pages/s, was {before['pages_per_sec']:.1f}")
+		if before.get('peak_memory_kb') and now['peak_memory_kb'] > before['peak_memory_kb'] * (1 + tolerance):
+			problems.append(f"{backend}: peak {now['peak_memory_kb']:.0f} KB, was {before['peak_memory_kb']:.0f} KB")
+	return problems
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Benchmark and cross-check the CopperKnob parser backends.")
+	ap.add_argument("paths", nargs='*', help=f"saved pages or directories of them (default: {DEFAULT_CORPUS})")
+	ap.add_argument("--cache-dir", help="also benchmark every page in this page cache")
+	ap.add_argument("--backend", action="append", choices=PARSER_BACKENDS, help="limit to these backends")
+	ap.add_argument("--rounds", type=int, default=5)
+	ap.add_argument("-o", "--output", help="write the results as JSON here")
+	ap.add_argument("--baseline", help="earlier results JSON; exit non-zero on regressions")
+	ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown/memory growth vs baseline")
+	args = ap.parse_args(argv)
+
+	corpus = load_corpus(args.paths or ([] if args.cache_dir else [DEFAULT_CORPUS]), args.cache_dir)
+	if not corpus:
+		ap.error("no pages to benchmark")
+	results = run_benchmark(corpus, args.backend, args.rounds)
+	print(f"{results['pages']} pages, {results['bytes'] / 1024:.0f} KB, {results['rounds']} rounds")
+	for backend, r in results['backends'].items():
+		print(
+			f"{backend:12} {r['pages_per_sec']:8.1f} pages/s  {r['ms_per_page']:6.2f} ms/page "
+			f"(build {r['build_ms_per_page']:.2f}, extract {r['extract_ms_per_page']:.2f})  "
+			f"peak {r['peak_memory_kb']:.0f} KB"
+		)
+		print(' ' * 13 + '  '.join(f"{f} {us:.0f}us" for f, us in r['field_us_per_page'].items()))
+	for m in results['mismatches']:
+		print(f"MISMATCH {m['backend']} on {m['page']}: {', '.join(m['fields'])}")
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as f:
+			json.dump(results, f, indent=2)
+
+	failed = bool(results['mismatches'])
+	if args.baseline:
+		with open(args.baseline, encoding='utf-8') as f:
+			for problem in find_regressions(results, json.load(f), args.tolerance):
+				print(f"REGRESSION {problem}")
+				failed = True
+	sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+	main()
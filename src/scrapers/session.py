@@ -0,0 +1,84 @@
+import os
+import json
+import atexit
+import threading
+from http.cookiejar import LWPCookieJar
+import cloudscraper
+from paths import DATA_DIR
+
+# Cookies (including Cloudflare clearance) and the browser fingerprint they were issued to
+SESSION_DIR = DATA_DIR
+COOKIE_JAR_PATH = os.path.join(SESSION_DIR, "cookies.lwp")
+FINGERPRINT_PATH = os.path.join(SESSION_DIR, "fingerprint.json")
+
+_local = threading.local()
+_lock = threading.Lock()
+_cookie_jar = None
+_fingerprint = None  # {'headers': {...}, 'cipherSuite': '...'}
+
+
+def _load_shared_state():
+	"""
+	Load (once per process) the cookie jar and fingerprint shared by every thread's session.
+	"""
+	global _cookie_jar, _fingerprint
+	with _lock:
+		if _cookie_jar is not None:
+			return
+		jar = LWPCookieJar(COOKIE_JAR_PATH)
+		try:
+			jar.load(ignore_discard=True)
+		except (OSError, ValueError):
+			pass
+		try:
+			with open(FINGERPRINT_PATH, encoding='utf-8') as f:
+				_fingerprint = json.load(f)
+		except (OSError, ValueError):
+			_fingerprint = None
+		_cookie_jar = jar
+
+def _create_session():
+	global _fingerprint
+	_load_shared_state()
+	with _lock:
+		if _fingerprint is None:
+			# The first session picks the browser headers/ciphers; Cloudflare clearance cookies
+			# are only honoured for the same fingerprint, so every later session copies it
+			scraper = cloudscraper.create_scraper()
+			_fingerprint = {'headers': dict(scraper.headers), 'cipherSuite': scraper.cipherSuite}
+		else:
+			scraper = cloudscraper.create_scraper(cipherSuite=_fingerprint['cipherSuite'])
+			scraper.headers.clear()
+			scraper.headers.update(_fingerprint['headers'])
+	scraper.cookies = _cookie_jar
+	return scraper
+
+def get_session():
+	"""
+	Return the calling thread's long-lived scraper session.
+	Sessions keep connections alive per host and share one thread-safe cookie jar,
+	so a Cloudflare challenge solved by any thread (or a previous run) is reused.
+	"""
+	session = getattr(_local, 'session', None)
+	if session is None:
+		session = _create_session()
+		_local.session = session
+	return session
+
+def save_session():
+	"""
+	Persist the shared cookie jar and fingerprint so the next run can skip the challenge.
+	"""
+	with _lock:
+		if _cookie_jar is None:
+			return
+		try:
+			os.makedirs(SESSION_DIR, exist_ok=True)
+			_cookie_jar.save(ignore_discard=True)
+			if _fingerprint is not None:
+				with open(FINGERPRINT_PATH, 'w', encoding='utf-8') as f:
+					json.dump(_fingerprint, f)
+		except OSError as e:
+			print(f"Could not save scraper session: {e}")
+
+atexit.register(save_session)
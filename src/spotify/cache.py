@@ -0,0 +1,64 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from paths import DATA_DIR
+
+DEFAULT_CACHE_PATH = os.path.join(DATA_DIR, "spotify.sqlite3")
+DEFAULT_TTL = 90 * 24 * 3600
+
+
+class SpotifyCache:
+	"""
+	Persistent cache of Spotify answers, as JSON per (kind, key): 'search' results keyed by
+	db.normalize.song_key (None records "no match"), and 'track', 'features' and 'artist'
+	objects keyed by Spotify id. Entries older than `ttl` count as missing.
+	"""
+	def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+		self.ttl = ttl
+		self.lock = threading.Lock()
+		os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+		self.conn = sqlite3.connect(path, check_same_thread=False)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute('''
+			CREATE TABLE IF NOT EXISTS responses (
+				kind TEXT NOT NULL,
+				key TEXT NOT NULL,
+				body TEXT,
+				fetched_at REAL NOT NULL,
+				PRIMARY KEY (kind, key)
+			) WITHOUT ROWID
+		''')
+		self.conn.commit()
+
+	def get_many(self, kind, keys):
+		"""
+		{key: value} for the keys cached and fresh; missing keys are left out.
+		"""
+		found = {}
+		keys = list(dict.fromkeys(keys))
+		oldest = time.time() - self.ttl
+		with self.lock:
+			for i in range(0, len(keys), 500):
+				chunk = keys[i:i + 500]
+				for key, body in self.conn.execute(
+					f"SELECT key, body FROM responses WHERE kind = ? AND fetched_at >= ? "
+					f"AND key IN ({', '.join('?' for _ in chunk)})",
+					[kind, oldest] + chunk
+				):
+					found[key] = json.loads(body) if body is not None else None
+		return found
+
+	def put_many(self, kind, items):
+		now = time.time()
+		with self.lock:
+			self.conn.executemany(
+				"INSERT OR REPLACE INTO responses (kind, key, body, fetched_at) VALUES (?, ?, ?, ?)",
+				[(kind, key, json.dumps(value) if value is not None else None, now) for key, value in items.items()]
+			)
+			self.conn.commit()
+
+	def close(self):
+		with self.lock:
+			self.conn.close()
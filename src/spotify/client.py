@@ -0,0 +1,143 @@
+import time
+import base64
+import threading
+import requests
+from ratelimit import TokenBucket
+
+API_BASE = "https://api.spotify.com/v1"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+# Most ids each batched endpoint accepts per call
+TRACKS_BATCH = 50
+ARTISTS_BATCH = 50
+AUDIO_FEATURES_BATCH = 100
+
+
+class SpotifyError(Exception):
+	def __init__(self, status, message):
+		super().__init__(f"Spotify API error {status}: {message}")
+		self.status = status
+
+
+class RequestsTransport:
+	"""
+	Default transport. A transport is any callable
+	(method, url, headers, params, data, timeout) -> (status, headers, json body or None),
+	so tests can swap in a fake or point api_base at a local server.
+	"""
+	def __init__(self):
+		self.local = threading.local()
+
+	def __call__(self, method, url, headers=None, params=None, data=None, timeout=15):
+		session = getattr(self.local, 'session', None)
+		if session is None:
+			session = self.local.session = requests.Session()
+		resp = session.request(method, url, headers=headers, params=params, data=data, timeout=timeout)
+		try:
+			body = resp.json()
+		except ValueError:
+			body = None
+		return resp.status_code, resp.headers, body
+
+
+def _header(headers, name):
+	value = headers.get(name)
+	return value if value is not None else headers.get(name.lower())
+
+def _chunks(items, size):
+	for i in range(0, len(items), size):
+		yield items[i:i + size]
+
+
+class SpotifyClient:
+	"""
+	Client-credentials Spotify Web API client. Every call waits on one token bucket
+	(`rate` requests per second); 429 and 5xx answers pause the bucket for Retry-After
+	(or back off) and are retried, and an expired token is renewed once.
+	"""
+	def __init__(self, client_id, client_secret, transport=None, api_base=API_BASE, token_url=TOKEN_URL,
+			rate=5.0, burst=5, retries=3, timeout=15):
+		self.client_id = client_id
+		self.client_secret = client_secret
+		self.transport = transport or RequestsTransport()
+		self.api_base = api_base.rstrip('/')
+		self.token_url = token_url
+		self.bucket = TokenBucket(rate, burst)
+		self.retries = retries
+		self.timeout = timeout
+		self.requests_made = 0
+		self.token = None
+		self.token_expires = 0
+		self.lock = threading.Lock()
+
+	def _access_token(self):
+		with self.lock:
+			if self.token is None or time.time() >= self.token_expires:
+				credentials = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+				status, _, body = self.transport(
+					'POST', self.token_url, headers={'Authorization': f'Basic {credentials}'},
+					data={'grant_type': 'client_credentials'}, timeout=self.timeout
+				)
+				if status != 200 or not body:
+					raise SpotifyError(status, (body or {}).get('error_description', 'token request failed'))
+				self.token = body['access_token']
+				# Renew a minute early rather than have a request bounce
+				self.token_expires = time.time() + body.get('expires_in', 3600) - 60
+			return self.token
+
+	def get(self, path, params=None):
+		for attempt in range(self.retries + 1):
+			self.bucket.acquire()
+			with self.lock:
+				self.requests_made += 1
+			status, headers, body = self.transport(
+				'GET', self.api_base + path, headers={'Authorization': f'Bearer {self._access_token()}'},
+				params=params, timeout=self.timeout
+			)
+			if status == 200:
+				return body
+			if attempt < self.retries:
+				if status == 401:
+					with self.lock:
+						self.token = None
+					continue
+				if status == 429 or status >= 500:
+					try:
+						delay = float(_header(headers, 'Retry-After'))
+					except (TypeError, ValueError):
+						delay = 2 ** attempt
+					self.bucket.pause(delay)
+					continue
+			error = body.get('error') if isinstance(body, dict) else None
+			message = error.get('message') if isinstance(error, dict) else error
+			raise SpotifyError(status, message or 'request failed')
+
+	def search_track(self, title, artist=''):
+		"""
+		Best matching track object for a title/artist, or None.
+		"""
+		query = f'track:"{title}"'
+		if artist:
+			query += f' artist:"{artist}"'
+		body = self.get('/search', {'q': query, 'type': 'track', 'limit': 1})
+		items = ((body or {}).get('tracks') or {}).get('items') or []
+		return items[0] if items else None
+
+	def _batched(self, path, key, ids, size):
+		results = {}
+		for chunk in _chunks(list(ids), size):
+			body = self.get(path, {'ids': ','.join(chunk)})
+			for item_id, item in zip(chunk, (body or {}).get(key) or []):
+				results[item_id] = item
+		return results
+
+	def tracks(self, track_ids):
+		"""
+		{track id: track object or None}, TRACKS_BATCH ids per request.
+		"""
+		return self._batched('/tracks', 'tracks', track_ids, TRACKS_BATCH)
+
+	def artists(self, artist_ids):
+		return self._batched('/artists', 'artists', artist_ids, ARTISTS_BATCH)
+
+	def audio_features(self, track_ids):
+		return self._batched('/audio-features', 'audio_features', track_ids, AUDIO_FEATURES_BATCH)
@@ -0,0 +1,173 @@
+import os
+import re
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from db.models import get_connection, initialize_db, transaction
+from db.normalize import song_key
+from ratelimit import positive_rate
+from spotify.client import SpotifyClient, SpotifyError, API_BASE, TOKEN_URL
+from spotify.cache import SpotifyCache, DEFAULT_CACHE_PATH
+
+_TRACK_URL = re.compile(r'open\.spotify\.com/(?:intl-\w+/)?track/([A-Za-z0-9]+)')
+# How many of the primary artist's genres go into songs.genre
+GENRES_KEPT = 3
+SEARCH_SLICE = 200
+
+
+def track_id_from_url(url):
+	match = _TRACK_URL.search(url or '')
+	return match.group(1) if match else None
+
+def _track_summary(track):
+	# The parts of a track object enrichment needs; this is what the cache stores
+	if not track:
+		return None
+	return {
+		'id': track['id'],
+		'url': (track.get('external_urls') or {}).get('spotify') or f"https://open.spotify.com/track/{track['id']}",
+		'artist_ids': [a['id'] for a in track.get('artists') or [] if a.get('id')],
+	}
+
+def songs_to_enrich(conn=None, refresh=False):
+	"""
+	(id, title, primary artist, spotify_url) for songs missing bpm, genre or a Spotify link
+	(every song with `refresh`).
+	"""
+	if conn is None:
+		conn = get_connection()
+	where = "" if refresh else "WHERE s.bpm IS NULL OR s.genre IS NULL OR s.spotify_url IS NULL OR s.spotify_url = ''"
+	return conn.execute(f'''
+		SELECT s.id, s.title,
+			(SELECT artist_name FROM song_artists sa WHERE sa.song_id = s.id ORDER BY sa.id LIMIT 1),
+			s.spotify_url
+		FROM songs s {where} ORDER BY s.id
+	''').fetchall()
+
+def _cached_or_fetched(cache, kind, keys, fetch):
+	found = cache.get_many(kind, keys)
+	missing = [k for k in dict.fromkeys(keys) if k not in found]
+	if missing:
+		fetched = fetch(missing)
+		fetched = {k: fetched.get(k) for k in missing}
+		cache.put_many(kind, fetched)
+		found.update(fetched)
+	return found
+
+def enrich_songs(client, cache, conn=None, refresh=False, workers=4, progress=print):
+	"""
+	Fill songs.spotify_url, bpm (rounded tempo) and genre from Spotify.
+	Only track resolution costs a request per song, and only for songs without a Spotify
+	link whose normalized title/artist has never been searched; everything else goes
+	through the cache and the batched tracks/audio-features/artists endpoints.
+	Existing values are kept unless `refresh`. Returns the number of songs updated.
+	"""
+	if conn is None:
+		conn = get_connection()
+	songs = songs_to_enrich(conn, refresh)
+	if not songs:
+		return 0
+
+	# 1. Song -> track: a link already stored, else a cached or new search
+	track_for_song = {}
+	keys = {}
+	by_key = {}
+	for song_id, title, artist, url in songs:
+		track_id = track_id_from_url(url)
+		if track_id:
+			track_for_song[song_id] = track_id
+		else:
+			keys[song_id] = song_key(title, artist or '')
+			by_key.setdefault(keys[song_id], (title, artist or ''))
+
+	def search(missing):
+		with ThreadPoolExecutor(max_workers=workers) as pool:
+			found = pool.map(lambda key: _track_summary(client.search_track(*by_key[key])), missing)
+			return dict(zip(missing, found))
+
+	# Searched in slices so an interrupted run keeps what it already paid for
+	searched = {}
+	pending = list(by_key)
+	for i in range(0, len(pending), SEARCH_SLICE):
+		searched.update(_cached_or_fetched(cache, 'search', pending[i:i + SEARCH_SLICE], search))
+	progress(f"Resolved {sum(1 for s in searched.values() if s)} of {len(by_key)} songs by search")
+	summaries = {s['id']: s for s in searched.values() if s}
+	for song_id, key in keys.items():
+		if searched.get(key):
+			track_for_song[song_id] = searched[key]['id']
+
+	linked = [t for t in track_for_song.values() if t not in summaries]
+	summaries.update(
+		(t, s) for t, s in _cached_or_fetched(
+			cache, 'track', linked, lambda ids: {t: _track_summary(tr) for t, tr in client.tracks(ids).items()}
+		).items() if s
+	)
+
+	# 2. Batched details for every track and primary artist involved
+	track_ids = list(dict.fromkeys(track_for_song.values()))
+	features = _cached_or_fetched(
+		cache, 'features', track_ids,
+		lambda ids: {t: {'tempo': f.get('tempo')} if f else None for t, f in client.audio_features(ids).items()}
+	)
+	artist_ids = list(dict.fromkeys(
+		summaries[t]['artist_ids'][0] for t in track_ids if t in summaries and summaries[t]['artist_ids']
+	))
+	artists = _cached_or_fetched(
+		cache, 'artist', artist_ids,
+		lambda ids: {a: {'genres': x.get('genres') or []} if x else None for a, x in client.artists(ids).items()}
+	)
+	progress(f"Fetched details for {len(track_ids)} tracks and {len(artist_ids)} artists")
+
+	# 3. One write for everything
+	updates = []
+	for song_id, track_id in track_for_song.items():
+		summary = summaries.get(track_id)
+		feature = features.get(track_id)
+		tempo = feature.get('tempo') if feature else None
+		artist = artists.get(summary['artist_ids'][0]) if summary and summary['artist_ids'] else None
+		genres = ', '.join(artist['genres'][:GENRES_KEPT]) if artist and artist['genres'] else None
+		values = (summary['url'] if summary else None, round(tempo) if tempo else None, genres)
+		# Songs whose track turned up nothing usable are not counted as updated
+		if any(v is not None for v in values):
+			updates.append(values + (song_id,))
+	if refresh:
+		sql = "UPDATE songs SET spotify_url = coalesce(?, spotify_url), bpm = coalesce(?, bpm), genre = coalesce(?, genre) WHERE id = ?"
+	else:
+		sql = (
+			"UPDATE songs SET spotify_url = coalesce(nullif(spotify_url, ''), ?), "
+			"bpm = coalesce(bpm, ?), genre = coalesce(genre, ?) WHERE id = ?"
+		)
+	with transaction(conn):
+		conn.executemany(sql, updates)
+	return len(updates)
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Fill song BPM, genre and Spotify links from the Spotify Web API.")
+	ap.add_argument("--client-id", default=os.environ.get("SPOTIFY_CLIENT_ID"))
+	ap.add_argument("--client-secret", default=os.environ.get("SPOTIFY_CLIENT_SECRET"))
+	ap.add_argument("--api-base", default=API_BASE, help="API root, e.g. a local fake server")
+	ap.add_argument("--token-url", default=TOKEN_URL)
+	ap.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="response cache file")
+	ap.add_argument("--rate", type=positive_rate, default=5.0, help="requests per second")
+	ap.add_argument("--workers", type=int, default=4, help="concurrent searches")
+	ap.add_argument("--refresh", action="store_true", help="re-check songs that already have data")
+	args = ap.parse_args(argv)
+	if not args.client_id or not args.client_secret:
+		ap.error("set SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET (or pass --client-id/--client-secret)")
+	initialize_db()
+	client = SpotifyClient(
+		args.client_id, args.client_secret, api_base=args.api_base, token_url=args.token_url,
+		rate=args.rate, burst=max(1, int(args.rate))
+	)
+	cache = SpotifyCache(args.cache)
+	try:
+		updated = enrich_songs(client, cache, refresh=args.refresh, workers=args.workers)
+	except SpotifyError as e:
+		print(f"Error enriching songs: {e}", file=sys.stderr)
+		sys.exit(1)
+	finally:
+		cache.close()
+	print(f"Updated {updated} songs using {client.requests_made} API requests.")
+
+if __name__ == "__main__":
+	main()
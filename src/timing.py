@@ -0,0 +1,222 @@
+import os
+import sys
+import time
+import atexit
+import bisect
+import sqlite3
+import threading
+from functools import wraps
+
+# Everything here is off unless DANCEDB_TIMING is set, and then costs next to nothing:
+# timed() hands back the undecorated function and connections use the plain class.
+#   DANCEDB_TIMING=1          per-operation histograms (printed at exit) and the slow log
+#   DANCEDB_SLOW_MS=50        anything slower than this is logged, SQL with its statement
+#   DANCEDB_TIMING_LOG=path   log to a file instead of stderr
+#   DANCEDB_SQL_TRACE=1       also log every statement SQLite runs, trigger bodies included
+#   DANCEDB_PROFILE=path      cProfile the main thread and write pstats there at exit
+ENABLED = bool(os.environ.get("DANCEDB_TIMING"))
+SLOW_MS = float(os.environ.get("DANCEDB_SLOW_MS") or 50)
+SQL_TRACE = ENABLED and bool(os.environ.get("DANCEDB_SQL_TRACE"))
+PROFILE_PATH = os.environ.get("DANCEDB_PROFILE")
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+log = None  # the "dancedb.timing" logger; logging is only imported once timing is enabled
+_stats = {}
+_lock = threading.Lock()
+
+
+def record(name, seconds, detail=None):
+	"""
+	Add one measurement of operation `name` and log it if it was slow.
+	"""
+	ms = seconds * 1e3
+	with _lock:
+		entry = _stats.get(name)
+		if entry is None:
+			entry = _stats[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(BUCKETS_MS) + 1)}
+		entry['count'] += 1
+		entry['total_ms'] += ms
+		entry['max_ms'] = max(entry['max_ms'], ms)
+		entry['buckets'][bisect.bisect_right(BUCKETS_MS, ms)] += 1
+	if ms >= SLOW_MS:
+		log.warning("slow %s: %.1f ms%s", name, ms, f" | {detail}" if detail else "")
+
+def timed(name, detail=None):
+	"""
+	Time a block (`with timed("scrape.fetch"):`) or every call of a function (`@timed("ui.load")`).
+	When timing is disabled, the block runs untimed and functions are returned undecorated.
+	"""
+	return _Timed(name, detail) if ENABLED else _Disabled
+
+class _Timed:
+	def __init__(self, name, detail):
+		self.name = name
+		self.detail = detail
+
+	def __call__(self, func):
+		name = self.name
+		@wraps(func)
+		def wrapper(*args, **kwargs):
+			start = time.perf_counter()
+			try:
+				return func(*args, **kwargs)
+			finally:
+				record(name, time.perf_counter() - start)
+		return wrapper
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+
+	def __exit__(self, *exc):
+		record(self.name, time.perf_counter() - self.start, self.detail)
+
+class _DisabledTimer:
+	def __call__(self, func):
+		return func
+
+	def __enter__(self):
+		pass
+
+	def __exit__(self, *exc):
+		pass
+
+_Disabled = _DisabledTimer()
+
+class TimedCursor(sqlite3.Cursor):
+	"""
+	Cursor that times execute/executemany/executescript like TimedConnection does.
+	"""
+	def execute(self, sql, *args):
+		start = time.perf_counter()
+		try:
+			return super().execute(sql, *args)
+		finally:
+			_record_sql(sql, time.perf_counter() - start)
+
+	def executemany(self, sql, *args):
+		start = time.perf_counter()
+		try:
+			return super().executemany(sql, *args)
+		finally:
+			_record_sql(sql, time.perf_counter() - start)
+
+	def executescript(self, sql):
+		start = time.perf_counter()
+		try:
+			return super().executescript(sql)
+		finally:
+			record("sql.script", time.perf_counter() - start)
+
+class TimedConnection(sqlite3.Connection):
+	"""
+	sqlite3 connection that times every statement per kind (sql.select, sql.insert, ...),
+	whether run on the connection or on one of its cursors, and every commit. A statement
+	is timed while it is prepared and run up to its first row, which is where SQLite does
+	the sorting and aggregating; fetching the rest is not counted. Used as the connect()
+	factory when timing is enabled.
+	"""
+	def cursor(self, factory=TimedCursor):
+		return super().cursor(factory)
+
+	def execute(self, sql, *args):
+		start = time.perf_counter()
+		try:
+			return super().execute(sql, *args)
+		finally:
+			_record_sql(sql, time.perf_counter() - start)
+
+	def executemany(self, sql, *args):
+		start = time.perf_counter()
+		try:
+			return super().executemany(sql, *args)
+		finally:
+			_record_sql(sql, time.perf_counter() - start)
+
+	def executescript(self, sql):
+		start = time.perf_counter()
+		try:
+			return super().executescript(sql)
+		finally:
+			record("sql.script", time.perf_counter() - start)
+
+	def commit(self):
+		start = time.perf_counter()
+		try:
+			return super().commit()
+		finally:
+			record("sql.commit", time.perf_counter() - start)
+
+def _record_sql(sql, seconds):
+	verb = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else "empty"
+	record(f"sql.{verb}", seconds, " ".join(sql.split()))
+
+def connection_factory():
+	"""
+	The sqlite3.connect() factory to use: TimedConnection when timing is on.
+	"""
+	return TimedConnection if ENABLED else sqlite3.Connection
+
+def instrument_connection(conn):
+	"""
+	Hook a freshly opened connection up to the SQL trace log, if DANCEDB_SQL_TRACE is set.
+	"""
+	if SQL_TRACE:
+		conn.set_trace_callback(lambda statement: log.debug("sql: %s", statement))
+	return conn
+
+def stats():
+	"""
+	Snapshot of the measurements so far: {name: {count, total_ms, mean_ms, max_ms, buckets}}.
+	"""
+	with _lock:
+		return {
+			name: dict(entry, buckets=list(entry['buckets']), mean_ms=entry['total_ms'] / entry['count'])
+			for name, entry in _stats.items()
+		}
+
+def reset():
+	with _lock:
+		_stats.clear()
+
+def report(file=None):
+	"""
+	Print one line per operation, slowest total first, with its histogram.
+	"""
+	file = file or sys.stderr
+	labels = [f"<{b}" for b in BUCKETS_MS] + [f">={BUCKETS_MS[-1]}"]
+	entries = sorted(stats().items(), key=lambda item: -item[1]['total_ms'])
+	if not entries:
+		return
+	print(f"{'operation':24}{'calls':>8}{'total ms':>11}{'mean':>9}{'max':>9}  histogram (ms)", file=file)
+	for name, e in entries:
+		histogram = ' '.join(f"{label}:{n}" for label, n in zip(labels, e['buckets']) if n)
+		print(f"{name:24}{e['count']:8}{e['total_ms']:11.1f}{e['mean_ms']:9.2f}{e['max_ms']:9.1f}  {histogram}", file=file)
+
+def _setup():
+	global log
+	import logging
+	log = logging.getLogger("dancedb.timing")
+	if not log.handlers:
+		path = os.environ.get("DANCEDB_TIMING_LOG")
+		handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler(sys.stderr)
+		handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(message)s"))
+		log.addHandler(handler)
+	log.setLevel(logging.DEBUG if SQL_TRACE else logging.INFO)
+	atexit.register(report)
+
+def _start_profile(path):
+	import cProfile
+	profiler = cProfile.Profile()
+	profiler.enable()
+
+	def dump():
+		profiler.disable()
+		profiler.dump_stats(path)
+	atexit.register(dump)
+
+if ENABLED:
+	_setup()
+if PROFILE_PATH:
+	_start_profile(PROFILE_PATH)
@@ -1,10 +1,21 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QTextEdit
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QTextEdit, QProgressBar
+from ui.fetch_worker import FetchWorker
 
 class AddDanceDialog(QDialog):
-    def __init__(self, fetch_callback=None, parent=None):
+    def __init__(self, fetch_func=None, on_fetched=None, parent=None):
+        """
+        fetch_func(url) runs on a worker thread and returns the scraped dict (or None);
+        on_fetched(result, dialog) is then called on the GUI thread to fill in the form.
+        """
         super().__init__(parent)
         self.setWindowTitle("Add Dance")
-        self.fetch_callback = fetch_callback
+        self.fetch_func = fetch_func
+        self.on_fetched = on_fetched
+        self._fetch_serial = 0
+        self._fetch_workers = {}
+        # Step sheet shown in the dialog; steps_changed is set when a fetch replaced it
+        self.steps = []
+        self.steps_changed = False
         layout = QVBoxLayout()
 
         # Stepsheet URL
@@ -16,6 +27,18 @@ class AddDanceDialog(QDialog):
         url_layout.addWidget(self.fetch_btn)
         layout.addLayout(url_layout)
 
+        # Fetch progress (busy indicator while any fetch is in flight)
+        fetch_status_layout = QHBoxLayout()
+        self.fetch_progress = QProgressBar()
+        self.fetch_progress.setRange(0, 0)
+        self.fetch_progress.setMaximumHeight(10)
+        self.fetch_progress.setTextVisible(False)
+        self.fetch_progress.hide()
+        fetch_status_layout.addWidget(self.fetch_progress)
+        self.fetch_status = QLabel("")
+        fetch_status_layout.addWidget(self.fetch_status)
+        layout.addLayout(fetch_status_layout)
+
         # Name
         layout.addWidget(QLabel("Dance Name:"))
         self.name_input = QLineEdit()
@@ -64,6 +87,12 @@ class AddDanceDialog(QDialog):
         self.songs_input.setReadOnly(True)
         layout.addWidget(self.songs_input)
 
+        # Steps (read-only, from the stepsheet)
+        layout.addWidget(QLabel("Steps:"))
+        self.steps_input = QTextEdit()
+        self.steps_input.setReadOnly(True)
+        layout.addWidget(self.steps_input)
+
         # Known Status
         layout.addWidget(QLabel("Known Status:"))
         self.known_combo = QComboBox()
@@ -104,9 +133,66 @@ class AddDanceDialog(QDialog):
         self.setLayout(layout)
 
         # Connect fetch button
-        if self.fetch_callback:
-            self.fetch_btn.clicked.connect(lambda: self.fetch_callback(self.url_input.text(), self))
+        if self.fetch_func:
+            self.fetch_btn.clicked.connect(self.start_fetch)
+        else:
+            self.fetch_btn.setEnabled(False)
 
         # Connect Save and Cancel buttons
         self.save_btn.clicked.connect(self.accept)
         self.cancel_btn.clicked.connect(self.reject)
+
+    def set_steps(self, steps, changed=False):
+        self.steps = steps or []
+        self.steps_changed = changed
+        lines = []
+        section = None
+        for step in self.steps:
+            if step.get('section') != section:
+                section = step.get('section')
+                if section:
+                    lines.append(section)
+            lines.append(f"{step.get('step', '')}\t{step.get('desc', '')}")
+        self.steps_input.setPlainText('\n'.join(lines))
+
+    def start_fetch(self):
+        url = self.url_input.text().strip()
+        if not url:
+            return
+        self._fetch_serial += 1
+        worker = FetchWorker(self.fetch_func, url, self._fetch_serial)
+        worker.signals.finished.connect(self._fetch_finished)
+        self._fetch_workers[worker.serial] = worker
+        worker.start()
+        self._update_fetch_status()
+
+    def _fetch_finished(self, serial, result):
+        if self._fetch_workers.pop(serial, None) is None:
+            return
+        # Only the most recent fetch fills in the form; older ones are superseded
+        if serial == self._fetch_serial:
+            if result:
+                if self.on_fetched:
+                    self.on_fetched(result, self)
+                self.fetch_status.setText("")
+            else:
+                self.fetch_status.setText("Could not fetch stepsheet.")
+        self._update_fetch_status()
+
+    def _update_fetch_status(self):
+        if self._fetch_workers:
+            self.fetch_progress.show()
+            self.fetch_status.setText("Fetching...")
+        else:
+            self.fetch_progress.hide()
+
+    def cancel_fetches(self):
+        for worker in self._fetch_workers.values():
+            worker.cancel()
+        self._fetch_workers.clear()
+        self._update_fetch_status()
+
+    def done(self, result):
+        # Accept, reject and closing the window all end here
+        self.cancel_fetches()
+        super().done(result)
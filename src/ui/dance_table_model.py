@@ -0,0 +1,229 @@
+from bisect import bisect_left
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QThreadPool
+from timing import timed
+from db.dances import LIST_COLUMNS, fetch_dance_row, fetch_dance_rows
+from ui.page_loader import PageLoader
+
+
+class DanceTableModel(QAbstractTableModel):
+	"""
+	Read-only table model over the dances table.
+	Rows are pulled from SQLite in pages as the view scrolls (canFetchMore/fetchMore),
+	and cell values are only turned into strings when the view asks for them.
+	Pages are read by a PageLoader on the model's own one-thread pool and inserted as
+	each chunk arrives, so the GUI thread never waits on a query for them.
+	"""
+	PAGE_SIZE = 500
+	CHUNK_SIZE = 100
+	# data(index, DanceIdRole) returns the dances.id of the row
+	DanceIdRole = Qt.UserRole + 1
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self._headers = [label for _, label in LIST_COLUMNS]
+		self._rows = []  # tuples of (id, *LIST_COLUMNS)
+		self._last_id = 0
+		self._exhausted = False
+		# Set while showing search results: {dance_id: snippet}, rows in rank order
+		self._snippets = None
+		# db.filters criteria applied to every query, or None
+		self._filters = None
+		# Page loads run one at a time; rows from a load whose serial is not current are dropped
+		self._pool = QThreadPool(self)
+		self._pool.setMaxThreadCount(1)
+		self._loader = None
+		self._serial = 0
+		# Dances added while a page was loading; the load may have read before they existed
+		self._added_while_loading = []
+
+	@timed("ui.model_reload")
+	def reload(self):
+		"""
+		Drop every cached row (and any search results) and start loading the first page again.
+		A load still in progress is cancelled.
+		"""
+		self.cancel_load()
+		self.beginResetModel()
+		self._rows = []
+		self._last_id = 0
+		self._exhausted = False
+		self._snippets = None
+		self.endResetModel()
+		self.fetchMore(QModelIndex())
+
+	def set_filters(self, filters):
+		"""
+		Filter every row shown from now on (see db.filters.filter_clause) and reload.
+		"""
+		self._filters = filters or None
+		self.reload()
+
+	def filters(self):
+		return self._filters
+
+	def show_search_results(self, results):
+		"""
+		Replace the rows with search hits, a list of (dance_id, snippet) best first.
+		Hits not matching the current filters are dropped.
+		"""
+		self.cancel_load()
+		self.beginResetModel()
+		self._rows = fetch_dance_rows((dance_id for dance_id, _ in results), filters=self._filters)
+		self._snippets = dict(results)
+		self._exhausted = True
+		self.endResetModel()
+
+	def is_searching(self):
+		return self._snippets is not None
+
+	def is_loading(self):
+		return self._loader is not None
+
+	def cancel_load(self, wait=False):
+		"""
+		Forget the page load in progress, if any: its rows are never inserted.
+		With `wait`, block until the loader thread is idle (at shutdown, before closing connections).
+		"""
+		self._serial += 1
+		if self._loader is not None:
+			self._loader.cancel(self._pool)
+			self._loader = None
+		self._added_while_loading = []
+		if wait:
+			self._pool.waitForDone()
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return len(self._rows)
+
+	def columnCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return len(self._headers)
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		if role == self.DanceIdRole:
+			return self._rows[index.row()][0]
+		if role == Qt.ToolTipRole and self._snippets is not None:
+			return self._snippets.get(self._rows[index.row()][0])
+		if role not in (Qt.DisplayRole, Qt.ToolTipRole):
+			return None
+		value = self._rows[index.row()][index.column() + 1]
+		return "" if value is None else str(value)
+
+	def headerData(self, section, orientation, role=Qt.DisplayRole):
+		if role != Qt.DisplayRole:
+			return None
+		if orientation == Qt.Horizontal:
+			return self._headers[section]
+		return section + 1
+
+	def canFetchMore(self, parent=QModelIndex()):
+		if parent.isValid():
+			return False
+		return not self._exhausted
+
+	@timed("ui.fetch_more")
+	def fetchMore(self, parent=QModelIndex()):
+		# Starts loading the next page; a second call while one is loading does nothing
+		if parent.isValid() or self._exhausted or self._loader is not None:
+			return
+		loader = PageLoader(self._serial, self._last_id, self.PAGE_SIZE, self._filters, self.CHUNK_SIZE)
+		loader.signals.rows.connect(self._rows_loaded)
+		loader.signals.finished.connect(self._load_finished)
+		self._loader = loader
+		loader.start(self._pool)
+
+	def _rows_loaded(self, serial, rows):
+		if serial != self._serial:
+			return
+		first = len(self._rows)
+		self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+		self._rows.extend(rows)
+		self._last_id = rows[-1][0]
+		self.endInsertRows()
+
+	def _load_finished(self, serial, exhausted):
+		if serial != self._serial:
+			return
+		self._loader = None
+		self._exhausted = exhausted
+		added, self._added_while_loading = self._added_while_loading, []
+		for dance_id in added:
+			self.dance_added(dance_id)
+
+	def row_for_id(self, dance_id):
+		"""
+		Row index of a loaded dance, or -1. Paged rows are kept in id order, so this is a bisect.
+		"""
+		if self._snippets is not None:
+			for pos, row in enumerate(self._rows):
+				if row[0] == dance_id:
+					return pos
+			return -1
+		pos = bisect_left(self._rows, (dance_id,))
+		if pos < len(self._rows) and self._rows[pos][0] == dance_id:
+			return pos
+		return -1
+
+	def dance_added(self, dance_id):
+		"""
+		Show a newly inserted dance without reloading.
+		Rows past the last fetched page are left for fetchMore to bring in,
+		and search results are left alone until the next search.
+		"""
+		if self._snippets is not None:
+			return
+		if self._loader is not None:
+			self._added_while_loading.append(dance_id)
+			return
+		if not self._exhausted and dance_id > self._last_id:
+			return
+		row = fetch_dance_row(dance_id, filters=self._filters)
+		if row is None or self.row_for_id(dance_id) >= 0:
+			return
+		pos = bisect_left(self._rows, (dance_id,))
+		self.beginInsertRows(QModelIndex(), pos, pos)
+		self._rows.insert(pos, row)
+		self._last_id = max(self._last_id, dance_id)
+		self.endInsertRows()
+
+	def dance_changed(self, dance_id):
+		"""
+		Re-read one dance and repaint only its row; it is dropped if it no longer matches the filters.
+		"""
+		pos = self.row_for_id(dance_id)
+		if pos < 0:
+			return
+		row = fetch_dance_row(dance_id, filters=self._filters)
+		if row is None:
+			self.dance_removed(dance_id)
+			return
+		self._rows[pos] = row
+		self.dataChanged.emit(self.index(pos, 0), self.index(pos, len(self._headers) - 1))
+
+	def dance_removed(self, dance_id):
+		"""
+		Drop one dance's row, if it is loaded.
+		"""
+		pos = self.row_for_id(dance_id)
+		if pos < 0:
+			return
+		self.beginRemoveRows(QModelIndex(), pos, pos)
+		del self._rows[pos]
+		self.endRemoveRows()
+
+	def dance_id(self, row):
+		"""
+		dances.id of a displayed row.
+		"""
+		return self._rows[row][0]
+
+	def value(self, row, column):
+		"""
+		Raw database value for a displayed cell (column index into LIST_COLUMNS).
+		"""
+		return self._rows[row][column + 1]
@@ -0,0 +1,53 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+# Workers that have been started and not yet finished. Holding them here keeps the
+# Python objects alive even if the dialog that started them is closed and collected.
+_active = set()
+
+
+class FetchSignals(QObject):
+	# (request serial, result of fetch_func or None on failure)
+	finished = pyqtSignal(int, object)
+
+
+class FetchWorker(QRunnable):
+	"""
+	Runs fetch_func(url) on a QThreadPool thread and reports back through signals.
+	Signals are delivered on the thread that owns `signals` (the GUI thread), so
+	receivers can touch widgets directly. A cancelled worker still runs to completion
+	if it has already started, but its result is never emitted.
+	"""
+	def __init__(self, fetch_func, url, serial):
+		super().__init__()
+		self.fetch_func = fetch_func
+		self.url = url
+		self.serial = serial
+		self.signals = FetchSignals()
+		self.cancelled = False
+		self.setAutoDelete(False)
+
+	def start(self, pool=None):
+		_active.add(self)
+		(pool or QThreadPool.globalInstance()).start(self)
+
+	def cancel(self, pool=None):
+		"""
+		Drop the result. A worker still waiting in the pool queue is removed from it.
+		"""
+		self.cancelled = True
+		if (pool or QThreadPool.globalInstance()).tryTake(self):
+			_active.discard(self)
+
+	def run(self):
+		try:
+			if self.cancelled:
+				return
+			try:
+				result = self.fetch_func(self.url)
+			except Exception as e:
+				print(f"Error fetching {self.url}: {e}")
+				result = None
+			if not self.cancelled:
+				self.signals.finished.emit(self.serial, result)
+		finally:
+			_active.discard(self)
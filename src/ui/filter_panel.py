@@ -0,0 +1,100 @@
+from PyQt5.QtCore import pyqtSignal, QTimer
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel, QComboBox, QSpinBox, QPushButton
+from db.filters import LEVELS
+
+
+class FilterPanel(QWidget):
+	"""
+	Level / count / wall / BPM filters above the dance table.
+	Emits filtersChanged with a db.filters dict ({} when nothing is filtered).
+	Typing into the number boxes emits once, shortly after the typing stops.
+	"""
+	filtersChanged = pyqtSignal(object)
+
+	WALLS = [1, 2, 4, 8]
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		layout = QHBoxLayout()
+		layout.setContentsMargins(0, 0, 0, 0)
+
+		layout.addWidget(QLabel("Level:"))
+		self.level_combo = QComboBox()
+		self.level_combo.addItem("Any", None)
+		for code, label in LEVELS:
+			self.level_combo.addItem(label, code)
+		layout.addWidget(self.level_combo)
+
+		layout.addWidget(QLabel("Count:"))
+		self.count_spin = self._spin(0, 256)
+		layout.addWidget(self.count_spin)
+
+		layout.addWidget(QLabel("Wall:"))
+		self.wall_combo = QComboBox()
+		self.wall_combo.addItem("Any", None)
+		for wall in self.WALLS:
+			self.wall_combo.addItem(str(wall), wall)
+		layout.addWidget(self.wall_combo)
+
+		layout.addWidget(QLabel("BPM:"))
+		self.bpm_min_spin = self._spin(0, 300)
+		layout.addWidget(self.bpm_min_spin)
+		layout.addWidget(QLabel("to"))
+		self.bpm_max_spin = self._spin(0, 300)
+		layout.addWidget(self.bpm_max_spin)
+
+		self.clear_btn = QPushButton("Clear Filters")
+		self.clear_btn.clicked.connect(self.clear)
+		layout.addWidget(self.clear_btn)
+		layout.addStretch()
+		self.setLayout(layout)
+
+		# Same debounce as the search box, so "128" reloads the table once rather than three times
+		self.spin_timer = QTimer(self)
+		self.spin_timer.setSingleShot(True)
+		self.spin_timer.setInterval(150)
+		self.spin_timer.timeout.connect(self._changed)
+		self.level_combo.currentIndexChanged.connect(self._changed)
+		self.wall_combo.currentIndexChanged.connect(self._changed)
+		for spin in (self.count_spin, self.bpm_min_spin, self.bpm_max_spin):
+			spin.valueChanged.connect(self.spin_timer.start)
+
+	def _spin(self, minimum, maximum):
+		# 0 shows as "Any"
+		spin = QSpinBox()
+		spin.setRange(minimum, maximum)
+		spin.setSpecialValueText("Any")
+		return spin
+
+	def filters(self):
+		filters = {}
+		level = self.level_combo.currentData()
+		if level is not None:
+			filters['levels'] = [level]
+		if self.count_spin.value():
+			filters['count'] = self.count_spin.value()
+		wall = self.wall_combo.currentData()
+		if wall is not None:
+			filters['wall'] = wall
+		if self.bpm_min_spin.value():
+			filters['bpm_min'] = self.bpm_min_spin.value()
+		if self.bpm_max_spin.value():
+			filters['bpm_max'] = self.bpm_max_spin.value()
+		return filters
+
+	def clear(self):
+		widgets = (self.level_combo, self.wall_combo, self.count_spin, self.bpm_min_spin, self.bpm_max_spin)
+		for widget in widgets:
+			widget.blockSignals(True)
+		self.level_combo.setCurrentIndex(0)
+		self.wall_combo.setCurrentIndex(0)
+		for spin in (self.count_spin, self.bpm_min_spin, self.bpm_max_spin):
+			spin.setValue(0)
+		for widget in widgets:
+			widget.blockSignals(False)
+		self._changed()
+
+	def _changed(self, *args):
+		# Emitting now covers any spin box edit still waiting on the timer
+		self.spin_timer.stop()
+		self.filtersChanged.emit(self.filters())
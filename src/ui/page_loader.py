@@ -0,0 +1,74 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from timing import timed
+from db.models import pooled_connection
+from db.dances import fetch_dance_page
+
+# Loaders that have been started and not yet finished (see fetch_worker._active)
+_active = set()
+
+
+class PageSignals(QObject):
+	# (load serial, list of (id, *LIST_COLUMNS) rows)
+	rows = pyqtSignal(int, object)
+	# (load serial, True if there are no rows after this page)
+	finished = pyqtSignal(int, bool)
+
+
+class PageLoader(QRunnable):
+	"""
+	Reads one page of list rows (id > after_id, up to `limit`) on a pool thread with a
+	pooled connection, emitting them in chunks of `chunk_size` as each keyset query
+	returns. Signals arrive on the GUI thread. Once cancelled, nothing more is emitted
+	and the remaining chunks are not read.
+	"""
+	def __init__(self, serial, after_id, limit, filters=None, chunk_size=100):
+		super().__init__()
+		self.serial = serial
+		self.after_id = after_id
+		self.limit = limit
+		self.filters = filters
+		self.chunk_size = chunk_size
+		self.signals = PageSignals()
+		self.cancelled = False
+		self.setAutoDelete(False)
+
+	def start(self, pool=None):
+		_active.add(self)
+		(pool or QThreadPool.globalInstance()).start(self)
+
+	def cancel(self, pool=None):
+		"""
+		Stop emitting. A loader still waiting in the pool queue is removed from it.
+		"""
+		self.cancelled = True
+		if (pool or QThreadPool.globalInstance()).tryTake(self):
+			_active.discard(self)
+
+	def run(self):
+		try:
+			if self.cancelled:
+				return
+			exhausted = True
+			try:
+				with timed("ui.page_load"), pooled_connection() as conn:
+					exhausted = self._load(conn)
+			except Exception as e:
+				print(f"Error loading dances: {e}")
+			if not self.cancelled:
+				self.signals.finished.emit(self.serial, exhausted)
+		finally:
+			_active.discard(self)
+
+	def _load(self, conn):
+		after_id, remaining = self.after_id, self.limit
+		while remaining > 0:
+			if self.cancelled:
+				return False
+			rows = fetch_dance_page(after_id, min(self.chunk_size, remaining), conn=conn, filters=self.filters)
+			if rows and not self.cancelled:
+				self.signals.rows.emit(self.serial, rows)
+			if len(rows) < min(self.chunk_size, remaining):
+				return True
+			after_id = rows[-1][0]
+			remaining -= len(rows)
+		return False
@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+from contextlib import contextmanager
+
+# Headless unless the caller picked a platform
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QModelIndex, QEventLoop
+from PyQt5.QtWidgets import QApplication, QDialog, QMessageBox
+from db import models
+from db.models import initialize_db, get_connection, close_connections, transaction
+from db.dances import fetch_dance_page, fetch_dance_rows, get_dance, delete_dances
+from db.search import search_dances
+from db.synthetic import generate_library
+from ui.add_dance_dialog import AddDanceDialog
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+FILTERS = {'levels': [3], 'count': 32, 'wall': 4, 'bpm_min': 120, 'bpm_max': 130}
+HARNESS_DANCE = "Scale Harness Dance"
+
+
+def _median_ms(func, repeat):
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		func()
+		times.append(time.perf_counter() - start)
+	return statistics.median(times) * 1e3
+
+def _settle(model):
+	# Page loads run on the model's loader thread; wait for the current one to be inserted
+	app = QApplication.instance()
+	while model.is_loading():
+		app.processEvents(QEventLoop.AllEvents | QEventLoop.WaitForMoreEvents)
+
+@contextmanager
+def _unattended():
+	# Dialogs answer immediately: edit/add dialogs are accepted as filled in, deletes confirmed
+	exec_, question = AddDanceDialog.exec_, QMessageBox.question
+	AddDanceDialog.exec_ = lambda self: QDialog.Accepted
+	QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.Yes)
+	try:
+		yield
+	finally:
+		AddDanceDialog.exec_, QMessageBox.question = exec_, question
+
+def prepare_database(path, dances, seed=0):
+	"""
+	Point db.models at `path` and make sure it holds exactly `dances` synthetic dances,
+	generating them if needed. Returns the seconds spent generating (0 if reused).
+	"""
+	close_connections()
+	models.DB_PATH = path
+	initialize_db()
+	if get_connection().execute("SELECT count(*) FROM dances").fetchone()[0] == dances:
+		return 0.0
+	close_connections()
+	for suffix in ("", "-wal", "-shm"):
+		if os.path.exists(path + suffix):
+			os.remove(path + suffix)
+	initialize_db()
+	start = time.perf_counter()
+	generate_library(dances, seed=seed)
+	return time.perf_counter() - start
+
+def _snapshot(dance_id):
+	conn = get_connection()
+	return (
+		conn.execute("SELECT * FROM dances WHERE id = ?", (dance_id,)).fetchone(),
+		conn.execute("SELECT dance_id, song_id FROM dance_songs WHERE dance_id = ?", (dance_id,)).fetchall(),
+	)
+
+def _restore(saved):
+	# Put a deleted dance back with its id and song links (links first, as the search index expects)
+	row, links = saved
+	with transaction() as conn:
+		conn.executemany("INSERT INTO dance_songs (dance_id, song_id) VALUES (?, ?)", links)
+		conn.execute(f"INSERT INTO dances VALUES ({', '.join('?' for _ in row)})", row)
+
+def measure_queries(dances, repeat=5, seed=0):
+	rng = random.Random(seed)
+	conn = get_connection()
+	sample = [rng.randint(1, dances) for _ in range(200)]
+	return {
+		'count_ms': _median_ms(lambda: conn.execute("SELECT count(*) FROM dances").fetchone(), repeat),
+		'first_page_ms': _median_ms(lambda: fetch_dance_page(0, 500), repeat),
+		'middle_page_ms': _median_ms(lambda: fetch_dance_page(dances // 2, 500), repeat),
+		'rows_by_id_200_ms': _median_ms(lambda: fetch_dance_rows(sample), repeat),
+		'get_dance_ms': _median_ms(lambda: get_dance(sample[0]), repeat),
+		'search_ms': _median_ms(lambda: search_dances("love heart"), repeat),
+		'filter_page_ms': _median_ms(lambda: fetch_dance_page(0, 500, filters=FILTERS), repeat),
+		'songs_for_200_dances_ms': _median_ms(lambda: conn.execute(
+			"SELECT ds.dance_id, s.title, sa.artist_name FROM dance_songs ds "
+			"JOIN songs s ON s.id = ds.song_id LEFT JOIN song_artists sa ON sa.song_id = s.id "
+			f"WHERE ds.dance_id IN ({', '.join('?' for _ in sample)})", sample
+		).fetchall(), repeat),
+		'dances_for_song_ms': _median_ms(lambda: conn.execute(
+			"SELECT d.id, d.name FROM dance_songs ds JOIN dances d ON d.id = ds.dance_id WHERE ds.song_id = ?",
+			(sample[1] // 2 or 1,)
+		).fetchall(), repeat),
+	}
+
+def measure_window(repeat=5):
+	"""
+	Time the main window's own code paths: opening (until it is interactive, and until the
+	first page is in), load_dances, scrolling in ten more pages, get_selected_row_id, and
+	the save/edit/delete round trip. Loads are timed until their rows are in the model.
+	"""
+	import main
+	results = {}
+	start = time.perf_counter()
+	window = main.MainWindow()
+	results['open_window_ms'] = (time.perf_counter() - start) * 1e3
+	app = QApplication.instance()
+	try:
+		_settle(window.model)
+		results['open_to_first_page_ms'] = (time.perf_counter() - start) * 1e3
+
+		def load():
+			window.load_dances()
+			_settle(window.model)
+		results['load_dances_ms'] = _median_ms(load, repeat)
+
+		def scroll():
+			load()
+			for _ in range(10):
+				window.model.fetchMore(QModelIndex())
+				_settle(window.model)
+		results['load_11_pages_ms'] = _median_ms(scroll, repeat)
+
+		window.table.selectRow(window.model.rowCount() // 2)
+		results['get_selected_row_id_ms'] = _median_ms(window.get_selected_row_id, repeat * 100)
+
+		with _unattended():
+			def save():
+				dialog = AddDanceDialog(parent=window)
+				dialog.name_input.setText(HARNESS_DANCE)
+				dialog.level_input.setText("Improver")
+				dialog.count_input.setText("32")
+				dialog.wall_input.setText("4")
+				window.save_dance(dialog)
+				dialog.deleteLater()
+			results['save_dance_ms'] = _median_ms(save, repeat)
+
+			window.table.selectRow(0)
+			results['edit_selected_ms'] = _median_ms(window.edit_selected, repeat)
+
+			times = []
+			for _ in range(repeat):
+				window.table.selectRow(0)
+				saved = _snapshot(window.get_selected_row_id())
+				start = time.perf_counter()
+				window.delete_selected()
+				times.append(time.perf_counter() - start)
+				_restore(saved)
+				load()
+			results['delete_selected_ms'] = statistics.median(times) * 1e3
+		app.processEvents()
+		# Leave the library exactly as generated, so the next run can reuse it
+		conn = get_connection()
+		delete_dances([row[0] for row in conn.execute("SELECT id FROM dances WHERE name = ?", (HARNESS_DANCE,))])
+	finally:
+		window.close()
+		window.deleteLater()
+		app.processEvents()
+	return results
+
+def run_harness(sizes=DEFAULT_SIZES, workdir=".", seed=0, repeat=5, progress=print):
+	app = QApplication.instance() or QApplication([sys.argv[0]])
+	results = {
+		'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'seed': seed,
+		'repeat': repeat,
+		'sizes': {},
+	}
+	os.makedirs(workdir, exist_ok=True)
+	for size in sizes:
+		path = os.path.join(workdir, f"scale_{size}_{seed}.sqlite3")
+		progress(f"{size} dances: preparing {path}")
+		generated = prepare_database(path, size, seed)
+		size_mb = sum(os.path.getsize(path + s) for s in ("", "-wal") if os.path.exists(path + s)) / 1e6
+		entry = {'generate_s': generated, 'db_mb': size_mb}
+		entry.update(measure_queries(size, repeat, seed))
+		entry.update(measure_window(repeat))
+		results['sizes'][str(size)] = entry
+		close_connections()
+	return results
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Time database queries and main-window operations at several library sizes.")
+	ap.add_argument("--sizes", type=int, nargs='+', default=list(DEFAULT_SIZES))
+	ap.add_argument("--workdir", default="scale_dbs", help="where the synthetic databases are kept (and reused)")
+	ap.add_argument("--seed", type=int, default=0)
+	ap.add_argument("--repeat", type=int, default=5)
+	ap.add_argument("-o", "--output", help="write the results as JSON here")
+	args = ap.parse_args(argv)
+	results = run_harness(args.sizes, args.workdir, args.seed, args.repeat)
+	names = list(next(iter(results['sizes'].values())).keys())
+	print(f"{'':26}" + ''.join(f"{size:>12}" for size in results['sizes']))
+	for name in names:
+		print(f"{name:26}" + ''.join(f"{entry[name]:12.2f}" for entry in results['sizes'].values()))
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as f:
+			json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+	main()